@@ -1,37 +1,113 @@
-from typing import List
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
 
 from app import crud
-from app.api.utils.db import get_db
+from app.core import config
+from app.core.encoders import dump_json
+from app.api.utils.db import get_book_part_read_db, get_db, get_read_db
+from app.api.utils.pagination import decode_cursor, set_next_cursor
+from app.api.utils.responses import not_modified_response, rendered_response
 from app.api.utils.security import get_current_active_user
-from app.models.user import User as DBUser
-from app.schemas.book_part import BookPart, BookPartCreate, BookPartUpdate
+from app.crud.base import ReadSession
+from app.schemas.book_part import (BookPart, BookPartBatch,
+                                   BookPartBatchRequest, BookPartCreate,
+                                   BookPartUpdate, BookPartVerses)
+from app.schemas.user import UserPrincipal
 
 router = APIRouter()
 
 
+def split_values(value: Optional[str]) -> Tuple[str, ...]:
+    """
+    Sorted distinct values of a comma separated query parameter.
+    """
+    if not value:
+        return ()
+    return tuple(sorted({item.strip() for item in value.split(",") if item.strip()}))
+
+
 @router.get("/", response_model=List[BookPart])
-def read_book_parts(
-    db: Session = Depends(get_db),
+async def read_book_parts(
+    response: Response,
+    db: ReadSession = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
-    kind: str = None
+    kind: str = None,
+    cursor: str = None,
 ):
     """
     Retrieve book_parts.
+
+    Pass the `X-Next-Cursor` header of a page as `cursor` to get the next one.
     """
-    book_parts = crud.book_part.get_multi_filter(db, skip=skip, limit=limit, kind=kind)
+    book_parts = await crud.book_part.get_multi_filter_async(
+        db, skip=skip, limit=limit, kind=kind, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, book_parts, limit)
     return book_parts
 
 
+async def read_batch(db: ReadSession, indexes: List[str]) -> Response:
+    """
+    Book parts for `indexes` in the requested order, from the cache or one `IN` query.
+    """
+    indexes = list(dict.fromkeys(index.strip() for index in indexes if index.strip()))
+    if len(indexes) > config.BOOK_PART_BATCH_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {config.BOOK_PART_BATCH_LIMIT} indexes can be read at once",
+        )
+    payloads = {}
+    for index in indexes:
+        rendered = crud.book_part.cache.get(index)
+        if rendered is not None:
+            payloads[index] = rendered.body
+    uncached = [index for index in indexes if index not in payloads]
+    if uncached:
+        payloads.update(
+            await crud.book_part.get_payloads_by_index_async(db, indexes=uncached)
+        )
+
+    items = [payloads[index] for index in indexes if index in payloads]
+    missing = [index for index in indexes if index not in payloads]
+    body = b'{"items":[' + b",".join(items) + b'],"missing":' + dump_json(missing) + b"}"
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/batch", response_model=BookPartBatch)
+async def read_book_parts_batch(
+    *,
+    db: ReadSession = Depends(get_read_db),
+    indexes: str,
+):
+    """
+    Get several book_parts by comma separated index, missing ones are listed in `missing`.
+    """
+    return await read_batch(db, indexes.split(","))
+
+
+@router.post("/batch", response_model=BookPartBatch)
+async def read_book_parts_batch_post(
+    *,
+    db: ReadSession = Depends(get_read_db),
+    batch_in: BookPartBatchRequest,
+):
+    """
+    Get several book_parts by index, for lists too long for a query string.
+    """
+    return await read_batch(db, batch_in.indexes)
+
+
 @router.post("/", response_model=BookPart)
 def create_book_part(
     *,
     db: Session = Depends(get_db),
     book_part_in: BookPartCreate,
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Create new book_part.
@@ -48,7 +124,7 @@ def update_book_part(
     db: Session = Depends(get_db),
     index: str,
     book_part_in: BookPartUpdate,
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Update an book_part.
@@ -61,18 +137,80 @@ def update_book_part(
 
 
 @router.get("/{index}", response_model=BookPart)
-def read_book_part(
+async def read_book_part(
     *,
-    db: Session = Depends(get_db),
+    db: ReadSession = Depends(get_book_part_read_db),
     index: str,
+    translations: str = None,
+    lang: str = None,
+    if_none_match: str = Header(None),
+    accept_encoding: str = Header(None),
 ):
     """
     Get book_part by ID.
+
+    `translations` (translator names) and `lang` (languages), both comma
+    separated, keep only the verse translations matching either of them.
     """
-    book_part = crud.book_part.get_by_index(db_session=db, index=index)
-    if not book_part:
-        raise HTTPException(status_code=404, detail="BookPart not found")
-    return book_part
+    names, langs = split_values(translations), split_values(lang)
+    key = (index, names, langs) if names or langs else index
+    rendered = crud.book_part.cache.get(key)
+    if rendered is None:
+        if if_none_match:
+            # answer from the stored ETag without loading the payload
+            validator = await crud.book_part.get_validator_by_index_async(db, index)
+            if validator and (names or langs):
+                validator = crud.book_part.project_validator(
+                    validator, names=names, langs=langs
+                )
+            response = not_modified_response(
+                validator, if_none_match=if_none_match, accept_encoding=accept_encoding
+            )
+            if response:
+                return response
+        rendered = await crud.book_part.get_rendered_by_index_async(db, index)
+        if not rendered:
+            raise HTTPException(status_code=404, detail="BookPart not found")
+        if names or langs:
+            rendered = await run_in_threadpool(
+                crud.book_part.project, rendered, names=names, langs=langs
+            )
+        crud.book_part.cache.set(key, rendered)
+    return rendered_response(
+        rendered, if_none_match=if_none_match, accept_encoding=accept_encoding
+    )
+
+
+@router.get("/{index}/verses", response_model=BookPartVerses)
+async def read_book_part_verses(
+    *,
+    db: ReadSession = Depends(get_read_db),
+    index: str,
+    from_: int = Query(None, alias="from"),
+    to: int = None,
+    translations: str = None,
+    lang: str = None,
+):
+    """
+    Get the verses of a book_part numbered `from` to `to` (inclusive, both optional).
+
+    `translations` and `lang` narrow the verse translations as in `read_book_part`.
+    """
+    verses = await crud.book_part.get_verses_by_index_async(
+        db, index, start=from_, end=to
+    )
+    if verses is None:
+        raise HTTPException(status_code=404, detail="BookPart verses not found")
+    names, langs = split_values(translations), split_values(lang)
+    if verses and (names or langs):
+        verses = await run_in_threadpool(
+            crud.book_part.project_verses, verses, names=names, langs=langs
+        )
+    body = (
+        b'{"index":' + dump_json(index)
+        + b',"verses":[' + b",".join(verses) + b"]}"
+    )
+    return Response(content=body, media_type="application/json")
 
 
 @router.delete("/{index}", response_model=BookPart)
@@ -80,7 +218,7 @@ def delete_book_part(
     *,
     db: Session = Depends(get_db),
     index: str,
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Delete an book_part.
@@ -1,28 +1,39 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.orm import Session
+from starlette.responses import Response
 
 from app import crud
-from app.api.utils.db import get_db
+from app.api.utils.db import get_db, get_read_db
+from app.api.utils.pagination import decode_cursor, set_next_cursor
+from app.api.utils.responses import not_modified_response, rendered_response
 from app.api.utils.security import get_current_active_user
-from app.models.user import User as DBUser
+from app.crud.base import ReadSession
 from app.schemas.book import Book, BookCreate, BookUpdate
+from app.schemas.user import UserPrincipal
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Book])
-def read_books(
-    db: Session = Depends(get_db),
+async def read_books(
+    response: Response,
+    db: ReadSession = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
-    kind: str = None
+    kind: str = None,
+    cursor: str = None,
 ):
     """
     Retrieve books.
+
+    Pass the `X-Next-Cursor` header of a page as `cursor` to get the next one.
     """
-    books = crud.book.get_multi_filter(db, skip=skip, limit=limit, kind=kind)
+    books = await crud.book.get_multi_filter_async(
+        db, skip=skip, limit=limit, kind=kind, after_id=decode_cursor(cursor)
+    )
+    set_next_cursor(response, books, limit)
     return books
 
 
@@ -31,7 +42,7 @@ def create_book(
     *,
     db: Session = Depends(get_db),
     book_in: BookCreate,
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Create new book.
@@ -48,7 +59,7 @@ def update_book(
     db: Session = Depends(get_db),
     index: str,
     book_in: BookUpdate,
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Update an book.
@@ -61,18 +72,24 @@ def update_book(
 
 
 @router.get("/{index}", response_model=Book)
-def read_book(
+async def read_book(
     *,
-    db: Session = Depends(get_db),
+    db: ReadSession = Depends(get_read_db),
     index: str,
+    if_none_match: str = Header(None),
 ):
     """
     Get book by ID.
     """
-    book = crud.book.get_by_index(db_session=db, index=index)
-    if not book:
+    if if_none_match:
+        validator = await crud.book.get_validator_by_index_async(db, index)
+        response = not_modified_response(validator, if_none_match=if_none_match)
+        if response:
+            return response
+    rendered = await crud.book.get_rendered_by_index_async(db, index)
+    if not rendered:
         raise HTTPException(status_code=404, detail="Book not found")
-    return book
+    return rendered_response(rendered, if_none_match=if_none_match)
 
 
 @router.delete("/{index}", response_model=Book)
@@ -80,7 +97,7 @@ def delete_book(
     *,
     db: Session = Depends(get_db),
     index: str,
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Delete an book.
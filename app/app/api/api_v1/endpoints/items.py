@@ -6,8 +6,8 @@ from sqlalchemy.orm import Session
 from app import crud
 from app.api.utils.db import get_db
 from app.api.utils.security import get_current_active_user
-from app.models.user import User as DBUser
 from app.schemas.item import Item, ItemCreate, ItemUpdate
+from app.schemas.user import UserPrincipal
 
 router = APIRouter()
 
@@ -17,7 +17,7 @@ def read_items(
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Retrieve items.
@@ -36,7 +36,7 @@ def create_item(
     *,
     db: Session = Depends(get_db),
     item_in: ItemCreate,
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Create new item.
@@ -53,7 +53,7 @@ def update_item(
     db: Session = Depends(get_db),
     id: int,
     item_in: ItemUpdate,
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Update an item.
@@ -72,7 +72,7 @@ def read_item(
     *,
     db: Session = Depends(get_db),
     id: int,
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Get item by ID.
@@ -90,7 +90,7 @@ def delete_item(
     *,
     db: Session = Depends(get_db),
     id: int,
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Delete an item.
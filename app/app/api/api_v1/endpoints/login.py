@@ -3,17 +3,17 @@ from datetime import timedelta
 from fastapi import APIRouter, Body, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app import crud
 from app.api.utils.db import get_db
 from app.api.utils.security import get_current_user
 from app.core import config
 from app.core.jwt import create_access_token
-from app.core.security import get_password_hash
-from app.models.user import User as DBUser
+from app.core.security import get_password_hash_async
 from app.schemas.msg import Msg
 from app.schemas.token import Token
-from app.schemas.user import User
+from app.schemas.user import User, UserPrincipal
 from app.utils import (
     generate_password_reset_token,
     send_reset_password_email,
@@ -24,13 +24,13 @@ router = APIRouter()
 
 
 @router.post("/login/access-token", response_model=Token, tags=["login"])
-def login_access_token(
+async def login_access_token(
     db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.user.authenticate(
+    user = await crud.user.authenticate_async(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -47,11 +47,14 @@ def login_access_token(
 
 
 @router.post("/login/test-token", tags=["login"], response_model=User)
-def test_token(current_user: DBUser = Depends(get_current_user)):
+def test_token(
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user),
+):
     """
     Test access token
     """
-    return current_user
+    return crud.user.get(db, id=current_user.id)
 
 
 @router.post("/password-recovery/{email}", tags=["login"], response_model=Msg)
@@ -74,14 +77,14 @@ def recover_password(email: str, db: Session = Depends(get_db)):
 
 
 @router.post("/reset-password/", tags=["login"], response_model=Msg)
-def reset_password(token: str = Body(...), new_password: str = Body(...), db: Session = Depends(get_db)):
+async def reset_password(token: str = Body(...), new_password: str = Body(...), db: Session = Depends(get_db)):
     """
     Reset password
     """
     email = verify_password_reset_token(token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid token")
-    user = crud.user.get_by_email(db, email=email)
+    user = await run_in_threadpool(crud.user.get_by_email, db, email=email)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -89,8 +92,8 @@ def reset_password(token: str = Body(...), new_password: str = Body(...), db: Se
         )
     elif not crud.user.is_active(user):
         raise HTTPException(status_code=400, detail="Inactive user")
-    hashed_password = get_password_hash(new_password)
-    user.hashed_password = hashed_password
-    db.add(user)
-    db.commit()
+    hashed_password = await get_password_hash_async(new_password)
+    await run_in_threadpool(
+        crud.user.set_password_hash, db, user=user, hashed_password=hashed_password
+    )
     return {"msg": "Password updated successfully"}
@@ -4,13 +4,14 @@ from fastapi import APIRouter, Body, Depends, HTTPException
 from fastapi.encoders import jsonable_encoder
 from pydantic.networks import EmailStr
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app import crud
 from app.api.utils.db import get_db
 from app.api.utils.security import get_current_active_superuser, get_current_active_user
 from app.core import config
-from app.models.user import User as DBUser
-from app.schemas.user import User, UserCreate, UserUpdate
+from app.core.security import get_password_hash_async
+from app.schemas.user import User, UserCreate, UserPrincipal, UserUpdate
 from app.utils import send_new_account_email
 
 router = APIRouter()
@@ -21,7 +22,7 @@ def read_users(
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: DBUser = Depends(get_current_active_superuser),
+    current_user: UserPrincipal = Depends(get_current_active_superuser),
 ):
     """
     Retrieve users.
@@ -31,25 +32,31 @@ def read_users(
 
 
 @router.post("/", response_model=User)
-def create_user(
+async def create_user(
     *,
     db: Session = Depends(get_db),
     user_in: UserCreate,
-    current_user: DBUser = Depends(get_current_active_superuser),
+    current_user: UserPrincipal = Depends(get_current_active_superuser),
 ):
     """
     Create new user.
     """
-    user = crud.user.get_by_email(db, email=user_in.email)
+    user = await run_in_threadpool(crud.user.get_by_email, db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this username already exists in the system.",
         )
-    user = crud.user.create(db, obj_in=user_in)
+    hashed_password = await get_password_hash_async(user_in.password)
+    user = await run_in_threadpool(
+        crud.user.create, db, obj_in=user_in, hashed_password=hashed_password
+    )
     if config.EMAILS_ENABLED and user_in.email:
-        send_new_account_email(
-            email_to=user_in.email, username=user_in.email, password=user_in.password
+        await run_in_threadpool(
+            send_new_account_email,
+            email_to=user_in.email,
+            username=user_in.email,
+            password=user_in.password,
         )
     return user
 
@@ -61,11 +68,12 @@ def update_user_me(
     password: str = Body(None),
     full_name: str = Body(None),
     email: EmailStr = Body(None),
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Update own user.
     """
+    current_user = crud.user.get(db, id=current_user.id)
     current_user_data = jsonable_encoder(current_user)
     user_in = UserUpdate(**current_user_data)
     if password is not None:
@@ -81,16 +89,16 @@ def update_user_me(
 @router.get("/me", response_model=User)
 def read_user_me(
     db: Session = Depends(get_db),
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Get current user.
     """
-    return current_user
+    return crud.user.get(db, id=current_user.id)
 
 
 @router.post("/open", response_model=User)
-def create_user_open(
+async def create_user_open(
     *,
     db: Session = Depends(get_db),
     password: str = Body(...),
@@ -105,28 +113,31 @@ def create_user_open(
             status_code=403,
             detail="Open user registration is forbidden on this server",
         )
-    user = crud.user.get_by_email(db, email=email)
+    user = await run_in_threadpool(crud.user.get_by_email, db, email=email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this username already exists in the system",
         )
     user_in = UserCreate(password=password, email=email, full_name=full_name)
-    user = crud.user.create(db, obj_in=user_in)
+    hashed_password = await get_password_hash_async(password)
+    user = await run_in_threadpool(
+        crud.user.create, db, obj_in=user_in, hashed_password=hashed_password
+    )
     return user
 
 
 @router.get("/{user_id}", response_model=User)
 def read_user_by_id(
     user_id: int,
-    current_user: DBUser = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """
     Get a specific user by id.
     """
     user = crud.user.get(db, id=user_id)
-    if user == current_user:
+    if user_id == current_user.id:
         return user
     if not crud.user.is_superuser(current_user):
         raise HTTPException(
@@ -141,7 +152,7 @@ def update_user(
     db: Session = Depends(get_db),
     user_id: int,
     user_in: UserUpdate,
-    current_user: DBUser = Depends(get_current_active_superuser),
+    current_user: UserPrincipal = Depends(get_current_active_superuser),
 ):
     """
     Update a user.
@@ -1,10 +1,17 @@
+from typing import List
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
+from app import crud
 from app.api.utils.security import get_current_active_superuser
-from app.models.user import User as DBUser
+from app.core.security import password_hasher
+from app.db.pool import pool_monitors
+from app.db.session import replicas
 from app.schemas.msg import Msg
-from app.schemas.user import User
+from app.schemas.stats import (CacheStats, PasswordHasherStats, PoolStats,
+                               ReplicaStats)
+from app.schemas.user import User, UserPrincipal
 from app.utils import send_test_email
 
 router = APIRouter()
@@ -12,10 +19,50 @@ router = APIRouter()
 
 @router.post("/test-email/", response_model=Msg, status_code=201)
 def test_email(
-    email_to: EmailStr, current_user: DBUser = Depends(get_current_active_superuser)
+    email_to: EmailStr,
+    current_user: UserPrincipal = Depends(get_current_active_superuser),
 ):
     """
     Test emails.
     """
     send_test_email(email_to=email_to)
     return {"msg": "Test email sent"}
+
+
+@router.get("/cache-stats/", response_model=CacheStats)
+def read_cache_stats(current_user: UserPrincipal = Depends(get_current_active_superuser)):
+    """
+    Book part response cache statistics.
+    """
+    return crud.book_part.cache.stats()
+
+
+@router.get("/pool-stats/", response_model=List[PoolStats])
+def read_pool_stats(current_user: UserPrincipal = Depends(get_current_active_superuser)):
+    """
+    Connection pool usage of this worker for the primary and each read replica,
+    counted since startup.
+    """
+    return [
+        monitor.stats(engine.pool) for engine, monitor in pool_monitors.items()
+    ]
+
+
+@router.get("/password-hasher-stats/", response_model=PasswordHasherStats)
+def read_password_hasher_stats(
+    current_user: UserPrincipal = Depends(get_current_active_superuser),
+):
+    """
+    Password hashing pool load, waits are in seconds.
+    """
+    return password_hasher.stats()
+
+
+@router.get("/replica-stats/", response_model=List[ReplicaStats])
+def read_replica_stats(
+    current_user: UserPrincipal = Depends(get_current_active_superuser),
+):
+    """
+    Read replicas of this worker and whether they currently take reads.
+    """
+    return replicas.stats()
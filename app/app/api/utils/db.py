@@ -1,5 +1,61 @@
-from starlette.requests import Request
+from sqlalchemy.exc import OperationalError
 
+from app import crud
+from app.db.session import ReplicaSession, Session, database, replicas
 
-def get_db(request: Request):
-    return request.state.db
+
+def get_db():
+    """
+    Session for the request, closed once the response is sent even if the endpoint raised.
+
+    Only endpoints that depend on it get one, and it checks out a pool
+    connection on its first query, so cached and static responses never do.
+    """
+    db = Session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_replica_db():
+    """
+    `get_db` on the next healthy read replica, or on the primary if there is none.
+
+    Only for reads that can lag behind the primary: writes, and reads that
+    must see them, use `get_db`.
+    """
+    engine = replicas.choose()
+    if engine is None:
+        yield from get_db()
+        return
+    db = ReplicaSession(bind=engine)
+    try:
+        yield db
+    except OperationalError:
+        replicas.eject(engine)
+        raise
+    finally:
+        db.close()
+
+
+def get_read_db():
+    """
+    Where the read endpoints query: the async database when enabled, else a replica session.
+    """
+    if database is not None:
+        yield database
+        return
+    yield from get_replica_db()
+
+
+def get_book_part_read_db(index: str):
+    """
+    `get_read_db`, or `get_db` for a book part this worker wrote within the
+    last REPLICA_MAX_LAG seconds, so a lagging replica cannot put the version
+    from before the write back into the response cache.
+    """
+    if crud.book_part.recently_written.get(index):
+        yield from get_db()
+        return
+    yield from get_read_db()
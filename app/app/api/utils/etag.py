@@ -0,0 +1,29 @@
+from typing import Optional
+
+from starlette.responses import Response
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    Whether an `If-None-Match` header value matches `etag` (weak comparison, RFC 7232).
+
+    The `encoded_etag` variants of `etag` match too.
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag or candidate.startswith(etag[:-1] + "-"):
+            return True
+    return False
+
+
+def not_modified(etag: str, vary: Optional[str] = None) -> Response:
+    headers = {"ETag": etag}
+    if vary:
+        headers["Vary"] = vary
+    return Response(status_code=304, headers=headers)
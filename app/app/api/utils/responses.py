@@ -0,0 +1,87 @@
+from typing import Container, Optional
+
+from starlette.responses import Response
+
+from app.api.utils.etag import etag_matches, not_modified
+from app.core.encoders import Rendered, Validator, encoded_etag
+
+# Stored encodings in order of preference when the client accepts several
+PREFERRED_ENCODINGS = ("br", "gzip")
+
+
+def negotiate_encoding(
+    accept_encoding: Optional[str], available: Container[str]
+) -> Optional[str]:
+    """
+    Pick the preferred content-coding in `available` that `accept_encoding` allows.
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in PREFERRED_ENCODINGS:
+        if coding in available and accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def not_modified_response(
+    validator: Optional[Validator],
+    *,
+    if_none_match: Optional[str] = None,
+    accept_encoding: Optional[str] = None,
+) -> Optional[Response]:
+    """
+    The 304 answering `if_none_match`, if it matches, carrying the ETag of the
+    encoding the full response would have been sent in.
+    """
+    if validator is None or not etag_matches(if_none_match, validator.etag):
+        return None
+    coding = negotiate_encoding(accept_encoding, validator.encodings)
+    etag = encoded_etag(validator.etag, coding) if coding else validator.etag
+    return not_modified(etag, "Accept-Encoding" if validator.encodings else None)
+
+
+def rendered_response(
+    rendered: Rendered,
+    *,
+    if_none_match: Optional[str] = None,
+    accept_encoding: Optional[str] = None,
+) -> Response:
+    """
+    Send a pre-rendered JSON body, using a stored encoding when the client accepts one.
+    """
+    if rendered.etag:
+        response = not_modified_response(
+            Validator(rendered.etag, tuple(rendered.encoded)),
+            if_none_match=if_none_match,
+            accept_encoding=accept_encoding,
+        )
+        if response:
+            return response
+
+    coding = negotiate_encoding(accept_encoding, rendered.encoded)
+    etag = rendered.etag
+    if etag and coding:
+        etag = encoded_etag(etag, coding)
+
+    headers = {}
+    if etag:
+        headers["ETag"] = etag
+    if rendered.encoded:
+        headers["Vary"] = "Accept-Encoding"
+    if coding:
+        headers["Content-Encoding"] = coding
+        body = rendered.encoded[coding]
+    else:
+        body = rendered.body
+    return Response(content=body, media_type="application/json", headers=headers)
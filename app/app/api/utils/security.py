@@ -1,3 +1,6 @@
+import hashlib
+import time
+
 import jwt
 from fastapi import Depends, HTTPException, Security
 from fastapi.security import OAuth2PasswordBearer
@@ -8,16 +11,24 @@ from starlette.status import HTTP_403_FORBIDDEN
 from app import crud
 from app.api.utils.db import get_db
 from app.core import config
+from app.core.cache import LRUCache
 from app.core.jwt import ALGORITHM
-from app.models.user import User
 from app.schemas.token import TokenPayload
+from app.schemas.user import UserPrincipal
 
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl="/api/v1/login/access-token")
 
+# (TokenPayload, expiry) of verified tokens keyed by their sha256, never the token itself
+token_cache = LRUCache(maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL)
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Security(reusable_oauth2)
-):
+
+def decode_token(token: str) -> TokenPayload:
+    key = hashlib.sha256(token.encode()).hexdigest()
+    cached = token_cache.get(key)
+    if cached is not None:
+        token_data, expires = cached
+        if expires is None or expires > time.time():
+            return token_data
     try:
         payload = jwt.decode(token, config.SECRET_KEY, algorithms=[ALGORITHM])
         token_data = TokenPayload(**payload)
@@ -25,19 +36,27 @@ def get_current_user(
         raise HTTPException(
             status_code=HTTP_403_FORBIDDEN, detail="Could not validate credentials"
         )
-    user = crud.user.get(db, id=token_data.user_id)
+    token_cache.set(key, (token_data, payload.get("exp")))
+    return token_data
+
+
+def get_current_user(
+    db: Session = Depends(get_db), token: str = Security(reusable_oauth2)
+) -> UserPrincipal:
+    token_data = decode_token(token)
+    user = crud.user.get_principal(db, id=token_data.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
-def get_current_active_user(current_user: User = Security(get_current_user)):
+def get_current_active_user(current_user: UserPrincipal = Security(get_current_user)):
     if not crud.user.is_active(current_user):
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
-def get_current_active_superuser(current_user: User = Security(get_current_user)):
+def get_current_active_superuser(current_user: UserPrincipal = Security(get_current_user)):
     if not crud.user.is_superuser(current_user):
         raise HTTPException(
             status_code=400, detail="The user doesn't have enough privileges"
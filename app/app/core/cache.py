@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    def __init__(self, *, maxsize: int, ttl: float):
+        """
+        Bounded, thread safe LRU cache whose entries also expire after `ttl` seconds.
+
+        The cache lives in the worker process, so a write handled by one worker
+        only invalidates that worker's copy; the TTL bounds how long the other
+        workers can keep serving the old value.
+
+        **Parameters**
+
+        * `maxsize`: Maximum number of entries kept, least recently used are evicted first
+        * `ttl`: Seconds an entry stays valid, `0` disables expiry
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if not self.ttl or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drop `key` along with its variants, the tuple keys starting with `key`.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+            variants = [
+                cached for cached in self._data
+                if isinstance(cached, tuple) and cached and cached[0] == key
+            ]
+            for cached in variants:
+                del self._data[cached]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
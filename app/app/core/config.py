@@ -17,6 +17,12 @@ if not SECRET_KEY:
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 8  # 60 minutes * 24 hours * 8 days = 8 days
 
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 60))  # seconds
+
 SERVER_NAME = os.getenv("SERVER_NAME")
 SERVER_HOST = os.getenv("SERVER_HOST")
 BACKEND_CORS_ORIGINS = os.getenv(
@@ -34,6 +40,37 @@ POSTGRES_DB = os.getenv("POSTGRES_DB")
 # )
 # SQLALCHEMY_DATABASE_URI = "sqlite:///../database.db?check_same_thread=False"
 SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
+# Serve the read endpoints through the `databases` package instead of a thread
+# per request, e.g. ASYNC_DATABASE_URL=postgresql://... (asyncpg) or sqlite:///... (aiosqlite)
+ASYNC_DATABASE_ENABLED = getenv_boolean("ASYNC_DATABASE_ENABLED")
+ASYNC_DATABASE_URI = os.getenv("ASYNC_DATABASE_URL", SQLALCHEMY_DATABASE_URI)
+# Comma separated read replicas of DATABASE_URL for the read endpoints
+REPLICA_DATABASE_URLS = [
+    url.strip() for url in os.getenv("REPLICA_DATABASE_URLS", "").split(",") if url.strip()
+]
+REPLICA_CHECK_INTERVAL = int(os.getenv("REPLICA_CHECK_INTERVAL", 10))  # seconds
+# How far the replicas may lag behind: a book part this worker wrote is read
+# from the primary for that long, so the response cache is not refilled with
+# the old version
+REPLICA_MAX_LAG = int(os.getenv("REPLICA_MAX_LAG", 5))  # seconds
+
+# Per worker process, so the database sees up to workers * (size + overflow) connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds
+DB_POOL_VALIDATE_INTERVAL = int(os.getenv("DB_POOL_VALIDATE_INTERVAL", 60))  # seconds, 0 disables
+
+BOOK_PART_CACHE_SIZE = int(os.getenv("BOOK_PART_CACHE_SIZE", 1024))
+BOOK_PART_CACHE_TTL = int(os.getenv("BOOK_PART_CACHE_TTL", 300))  # seconds
+BOOK_PART_BATCH_LIMIT = int(os.getenv("BOOK_PART_BATCH_LIMIT", 500))
+
+# Processes used to parse the raw book sources in data/, 1 parses in process
+DATA_PARSE_WORKERS = int(os.getenv("DATA_PARSE_WORKERS", 1))
+# Backend for the hubeali xhtml files, "html.parser" (BeautifulSoup) or "lxml"
+DATA_HTML_PARSER = os.getenv("DATA_HTML_PARSER", "html.parser")
+# Write the parsed books as one book part per line (NDJSON) instead of a single JSON document
+DATA_DUMP_NDJSON = getenv_boolean("DATA_DUMP_NDJSON", False)
 
 SMTP_TLS = getenv_boolean("SMTP_TLS", True)
 SMTP_PORT = None
@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import io
+import json
+from typing import Any, Collection, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, only gzip variants are stored without it
+    brotli = None
+
+# Columns of a book or book part that make up its content
+CONTENT_HASH_FIELDS = ("kind", "index", "data", "last_updated_id")
+
+
+def render_json(content: Any) -> bytes:
+    """
+    Encode `content` to the same bytes the default `JSONResponse` would send.
+    """
+    return dump_json(jsonable_encoder(content))
+
+
+def dump_json(content: Any) -> bytes:
+    """
+    `render_json` for content that is already made of plain JSON types.
+    """
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def content_hash(content: dict) -> str:
+    """
+    Hex digest of the `CONTENT_HASH_FIELDS` of `content`, stable across key order.
+    """
+    canonical = json.dumps(
+        jsonable_encoder({field: content.get(field) for field in CONTENT_HASH_FIELDS}),
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def make_etag(id: int, content_hash: str) -> str:
+    """
+    Strong ETag of a stored row; the id keeps a re-created row with the same content distinct.
+    """
+    return f'"{id}-{content_hash}"'
+
+
+def encoded_etag(etag: str, coding: str) -> str:
+    """
+    ETag of the `coding` encoded (or otherwise derived) representation of a response tagged `etag`.
+    """
+    return f'{etag[:-1]}-{coding}"'
+
+
+def projection_etag(etag: str, names: Collection[str], langs: Collection[str]) -> str:
+    """
+    ETag of the response tagged `etag` narrowed to the translations in `names` and `langs`.
+    """
+    projection = hashlib.sha256(dump_json([sorted(names), sorted(langs)])).hexdigest()[:16]
+    return encoded_etag(etag, projection)
+
+
+def verse_offsets(data: Any, payload: bytes) -> Optional[List[List[int]]]:
+    """
+    `[local_index, start, end]` byte range of each entry of `data["verses"]`
+    inside `payload`, the rendered response holding `data`, so single verses
+    can be cut out of it without decoding the whole chapter.
+    """
+    verses = data.get("verses") if isinstance(data, dict) else None
+    if not verses:
+        return None
+    encoded = [dump_json(verse) for verse in verses]
+    marker = b'"verses":['
+    start = payload.find(marker)
+    while start != -1:
+        position = start + len(marker)
+        offsets = []
+        for verse, body in zip(verses, encoded):
+            end = position + len(body)
+            if payload[position:end] != body:
+                break
+            local_index = verse.get("local_index") if isinstance(verse, dict) else None
+            offsets.append([local_index, position, end])
+            # skip the separating comma
+            position = end + 1
+        else:
+            return offsets
+        start = payload.find(marker, start + 1)
+    return None
+
+
+def gzip_compress(body: bytes) -> bytes:
+    buffer = io.BytesIO()
+    # fixed mtime so the same body always compresses to the same bytes
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=9, mtime=0) as f:
+        f.write(body)
+    return buffer.getvalue()
+
+
+def brotli_compress(body: bytes) -> Optional[bytes]:
+    if brotli is None:
+        return None
+    return brotli.compress(body, mode=brotli.MODE_TEXT)
+
+
+class Rendered(NamedTuple):
+    """
+    A response body ready to send, with its ETag and any stored encodings
+    of it keyed by content-coding (`gzip`, `br`).
+    """
+
+    etag: Optional[str]
+    body: bytes
+    encoded: Dict[str, bytes] = {}
+
+
+class Validator(NamedTuple):
+    """
+    The ETag of a stored response and the content-codings it is stored in,
+    enough to answer a conditional request without loading the body.
+    """
+
+    etag: str
+    encodings: Tuple[str, ...] = ()
@@ -0,0 +1,32 @@
+from starlette.datastructures import Headers
+from starlette.middleware import gzip
+from starlette.types import Message, Receive, Scope, Send
+
+
+class GZipMiddleware(gzip.GZipMiddleware):
+    """
+    `GZipMiddleware` that passes through responses which already carry a
+    `Content-Encoding`, such as the stored variants of book parts.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            if "gzip" in headers.get("Accept-Encoding", ""):
+                responder = GZipResponder(self.app, self.minimum_size)
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class GZipResponder(gzip.GZipResponder):
+    passthrough = False
+
+    async def send_with_gzip(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers
+        if self.passthrough:
+            await self.send(message)
+        else:
+            await super().send_with_gzip(message)
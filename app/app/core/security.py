@@ -1,6 +1,72 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core import config
+
+# Hashes with a different cost than BCRYPT_ROUNDS need an update, see `verify_and_update`
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=config.BCRYPT_ROUNDS
+)
+
+
+class PasswordHasher:
+    def __init__(self, *, workers: int):
+        """
+        Runs bcrypt on its own bounded thread pool, so a burst of logins queues
+        up here instead of taking over the threadpool that serves requests.
+
+        **Parameters**
+
+        * `workers`: Number of hashes computed at the same time
+        """
+        self.workers = workers
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+
+    async def run(self, func: Callable, *args):
+        submitted = time.monotonic()
+        with self._lock:
+            self.queued += 1
+
+        def call():
+            wait = time.monotonic() - submitted
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        return await asyncio.wrap_future(self._executor.submit(call))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "average_wait": self.total_wait / self.completed if self.completed else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+
+password_hasher = PasswordHasher(workers=config.PASSWORD_HASH_WORKERS)
 
 
 def verify_password(plain_password: str, hashed_password: str):
@@ -9,3 +75,19 @@ def verify_password(plain_password: str, hashed_password: str):
 
 def get_password_hash(password: str):
     return pwd_context.hash(password)
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify on the `password_hasher` pool, returning a new hash as well if
+    `hashed_password` was made with other settings than the current ones.
+    """
+    return await password_hasher.run(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run(pwd_context.hash, password)
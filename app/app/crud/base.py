@@ -1,18 +1,55 @@
-from typing import Generic, List, Optional, Type, TypeVar
+from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import inspect, select
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import ClauseElement
+from starlette.concurrency import run_in_threadpool
 
+from app.core.encoders import (CONTENT_HASH_FIELDS, Rendered, Validator,
+                               brotli_compress, content_hash, gzip_compress,
+                               make_etag, render_json, verse_offsets)
 from app.db.base_class import Base
 
+try:
+    from databases import Database
+except ImportError:  # only needed with ASYNC_DATABASE_ENABLED
+    Database = Any
+
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# Pre-compressed payload columns by the Content-Encoding they hold
+ENCODED_PAYLOADS = {"gzip": "payload_gzip", "br": "payload_br"}
+
+# What the `*_async` getters read from: a `Session`, or the async `database`
+ReadSession = Union[Session, Database]
+
+
+async def fetch_one(db: ReadSession, query: ClauseElement):
+    """
+    First row of a Core `query`, or `None`.
+
+    A `Session` runs it in the threadpool, the async database awaits it.
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(lambda: db.execute(query).first())
+    return await db.fetch_one(query)
+
+
+async def fetch_all(db: ReadSession, query: ClauseElement) -> list:
+    """
+    All rows of a Core `query`, see `fetch_one`.
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(lambda: db.execute(query).fetchall())
+    return await db.fetch_all(query)
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    def __init__(self, model: Type[ModelType], schema: Type[BaseModel] = None):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
 
@@ -22,6 +59,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         * `schema`: A Pydantic model (schema) class
         """
         self.model = model
+        self.schema = schema
 
     def get(self, db_session: Session, id: int) -> Optional[ModelType]:
         return db_session.query(self.model).filter(self.model.id == id).first()
@@ -29,10 +67,128 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def get_multi(self, db_session: Session, *, skip=0, limit=100) -> List[ModelType]:
         return db_session.query(self.model).offset(skip).limit(limit).all()
 
+    async def get_async(self, db: ReadSession, id: int) -> Optional[ModelType]:
+        row = await fetch_one(
+            db, select(self.loaded_columns()).where(self.model.id == id)
+        )
+        return self.from_row(row) if row is not None else None
+
+    def encoded_columns(self) -> Dict[str, str]:
+        return {
+            encoding: column
+            for encoding, column in ENCODED_PAYLOADS.items()
+            if hasattr(self.model, column)
+        }
+
+    async def get_validator_by_index_async(
+        self, db: ReadSession, index: str
+    ) -> Optional[Validator]:
+        """
+        ETag of the response for `index` and the encodings it is stored in,
+        without loading the payloads.
+        """
+        encoded_columns = self.encoded_columns()
+        row = await fetch_one(
+            db,
+            select(
+                [
+                    self.model.id,
+                    self.model.content_hash,
+                    self.model.payload.isnot(None).label("payload"),
+                ]
+                + [
+                    getattr(self.model, column).isnot(None).label(column)
+                    for column in encoded_columns.values()
+                ]
+            ).where(self.model.index == index),
+        )
+        if row is None or row["content_hash"] is None:
+            return None
+        etag = make_etag(row["id"], row["content_hash"])
+        if not row["payload"]:
+            return Validator(etag)
+        return Validator(
+            etag,
+            tuple(
+                encoding
+                for encoding, column in encoded_columns.items()
+                if row[column]
+            ),
+        )
+
+    async def get_rendered_by_index_async(
+        self, db: ReadSession, index: str
+    ) -> Optional[Rendered]:
+        """
+        Response for `index`, served from the stored payload when there is one.
+        """
+        encoded_columns = self.encoded_columns()
+        row = await fetch_one(
+            db,
+            select(
+                [self.model.id, self.model.content_hash, self.model.payload]
+                + [getattr(self.model, column) for column in encoded_columns.values()]
+            ).where(self.model.index == index),
+        )
+        if row is None:
+            return None
+        etag = make_etag(row["id"], row["content_hash"]) if row["content_hash"] else None
+        if row["payload"] is None:
+            return Rendered(etag, self.render(await self.get_async(db, row["id"])))
+        encoded = {
+            encoding: bytes(row[column])
+            for encoding, column in encoded_columns.items()
+            if row[column] is not None
+        }
+        return Rendered(etag, bytes(row["payload"]), encoded)
+
+    async def get_multi_filter_async(
+        self, db: ReadSession, *, kind: str, skip=0, limit=100, after_id: int = None
+    ) -> List[ModelType]:
+        """
+        Page through rows in id order, either by offset (`skip`) or, cheaper on
+        deep pages, by keyset (`after_id`: the id of the last row already seen).
+        """
+        query = select(self.loaded_columns())
+
+        if kind is not None:
+            query = query.where(self.model.kind == kind)
+
+        if after_id is not None:
+            query = query.where(self.model.id > after_id)
+
+        rows = await fetch_all(
+            db, query.order_by(self.model.id).offset(skip).limit(limit)
+        )
+        return [self.from_row(row) for row in rows]
+
+    def loaded_columns(self) -> list:
+        """
+        Columns of the model that a plain query loads, i.e. all but the deferred ones.
+        """
+        return [
+            prop.columns[0].label(prop.key)
+            for prop in inspect(self.model).column_attrs
+            if not prop.deferred
+        ]
+
+    def from_row(self, row) -> ModelType:
+        """
+        Detached model instance from a Core row of `loaded_columns`.
+        """
+        return self.model(
+            **{
+                prop.key: row[prop.key]
+                for prop in inspect(self.model).column_attrs
+                if not prop.deferred
+            }
+        )
+
     def create(self, db_session: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)
         db_session.add(db_obj)
+        self.set_derived(db_session, db_obj)
         db_session.commit()
         db_session.refresh(db_obj)
         return db_obj
@@ -40,16 +196,66 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def update(
         self, db_session: Session, *, db_obj: ModelType, obj_in: UpdateSchemaType
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
+        # only the column names are needed; encoding db_obj itself would
+        # choke on loaded binary columns such as the compressed payloads
+        obj_data = inspect(self.model).column_attrs.keys()
         update_data = jsonable_encoder(obj_in)
         for field in obj_data:
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
+        self.set_derived(db_session, db_obj)
         db_session.add(db_obj)
         db_session.commit()
         db_session.refresh(db_obj)
         return db_obj
 
+    def set_derived(self, db_session: Session, db_obj: ModelType) -> None:
+        """
+        Fill the columns computed from a row's content before it is committed.
+        """
+        if hasattr(self.model, "payload") and self.schema is not None:
+            # the rendered response includes the id, so make sure it is assigned
+            db_session.flush()
+        fields = set(CONTENT_HASH_FIELDS)
+        if self.schema is not None:
+            fields.update(self.schema.__fields__)
+        values = {field: getattr(db_obj, field) for field in fields if hasattr(db_obj, field)}
+        for column, value in self.derived_values(values).items():
+            setattr(db_obj, column, value)
+
+    def derived_values(self, values: dict) -> dict:
+        """
+        The columns `set_derived` fills, computed from a row's column `values`
+        (including its id when the model stores a payload).
+        """
+        derived = {}
+        if hasattr(self.model, "content_hash"):
+            derived["content_hash"] = content_hash(values)
+        if hasattr(self.model, "payload") and self.schema is not None:
+            try:
+                payload = render_json(self.schema(**values))
+            except ValidationError:
+                # e.g. created without a last_updated_id: store no payload,
+                # reads then render the row when it is asked for
+                payload = None
+            derived["payload"] = payload
+            rendered = payload is not None
+            if hasattr(self.model, "payload_gzip"):
+                derived["payload_gzip"] = gzip_compress(payload) if rendered else None
+            if hasattr(self.model, "payload_br"):
+                derived["payload_br"] = brotli_compress(payload) if rendered else None
+            if hasattr(self.model, "verse_offsets"):
+                derived["verse_offsets"] = (
+                    verse_offsets(values.get("data"), payload) if rendered else None
+                )
+        return derived
+
+    def render(self, db_obj: ModelType) -> bytes:
+        """
+        Response body of `db_obj` as the endpoints would send it through `schema`.
+        """
+        return render_json(self.schema.from_orm(db_obj))
+
     def remove(self, db_session: Session, *, id: int) -> ModelType:
         obj = db_session.query(self.model).get(id)
         db_session.delete(obj)
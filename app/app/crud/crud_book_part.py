@@ -1,20 +1,51 @@
-from typing import List, Optional
+import io
+import json
+from typing import Any, Collection, Dict, Iterable, List, Optional
 
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import JSON, Table, bindparam, case, select, text
 from sqlalchemy.orm import Session
 
-from app.crud.base import CRUDBase
+from app.core import config
+from app.core.cache import LRUCache
+from app.core.encoders import (Rendered, Validator, content_hash, dump_json,
+                               gzip_compress, projection_etag, verse_offsets)
+from app.crud.base import CRUDBase, ReadSession, fetch_all, fetch_one
 from app.models.book_part import BookPart
+from app.schemas import book_part as schemas
 from app.schemas.book_part import BookPartCreate, BookPartUpdate
 
 
+# encodings `project` compresses its responses in
+PROJECTED_ENCODINGS = ("gzip",)
+
+
 class CRUDBookPart(CRUDBase[BookPart, BookPartCreate, BookPartUpdate]):
+    def __init__(self, model, schema):
+        super().__init__(model, schema)
+        # Finished `read_book_part` responses keyed by index
+        self.cache = LRUCache(
+            maxsize=config.BOOK_PART_CACHE_SIZE, ttl=config.BOOK_PART_CACHE_TTL
+        )
+        # Indexes this worker wrote within the last REPLICA_MAX_LAG seconds
+        self.recently_written = LRUCache(
+            maxsize=config.BOOK_PART_CACHE_SIZE, ttl=config.REPLICA_MAX_LAG
+        )
+
+    def invalidate(self, index: str) -> None:
+        """
+        Drop the cached responses of `index` after writing it.
+        """
+        self.cache.invalidate(index)
+        self.recently_written.set(index, True)
+
     def create_by_user(
         self, db_session: Session, *, obj_in: BookPartCreate, user_id: int
     ) -> BookPart:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data, last_updated_id=user_id)
         db_session.add(db_obj)
+        self.set_derived(db_session, db_obj)
         db_session.commit()
         db_session.refresh(db_obj)
         return db_obj
@@ -22,31 +53,153 @@ class CRUDBookPart(CRUDBase[BookPart, BookPartCreate, BookPartUpdate]):
     def get_by_index(self, db_session: Session, index: str) -> Optional[BookPart]:
         return db_session.query(self.model).filter(self.model.index == index).first()
 
-    def get_multi_filter(
-        self, db_session: Session, *, kind: str, skip=0, limit=100
-    ) -> List[BookPart]:
-        q = db_session.query(self.model)
-        
-        if not(kind is None):
-            q = q.filter(BookPart.kind == kind)
-
-        return (
-            q.offset(skip)
-            .limit(limit)
+    def get_hashes_by_index(
+        self, db_session: Session, *, indexes: List[str], rendered: bool = False
+    ) -> Dict[str, Optional[str]]:
+        """
+        Stored content hash of each of `indexes`, leaving out those that do not exist.
+
+        With `rendered`, rows without a stored payload have no hash either, so
+        they do not look up to date.
+        """
+        content_hash = self.model.content_hash
+        if rendered:
+            content_hash = case(
+                [(self.model.payload.is_(None), None)], else_=content_hash
+            )
+        return dict(
+            db_session.query(self.model.index, content_hash)
+            .filter(self.model.index.in_(indexes))
             .all()
         )
 
-    def get_multi_by_index(
-        self, db_session: Session, *, indexes: List[str], skip=0, limit=100
-    ) -> List[BookPart]:
-        return (
-            db_session.query(self.model)
-            .filter(BookPart.index in indexes)
-            .offset(skip)
-            .limit(limit)
+    def get_data_by_index(
+        self, db_session: Session, *, indexes: List[str]
+    ) -> Dict[str, Any]:
+        return dict(
+            db_session.query(self.model.index, self.model.data)
+            .filter(self.model.index.in_(indexes))
             .all()
         )
 
+    def get_indexes_under(self, db_session: Session, *, index: str) -> List[str]:
+        """
+        `index` and the indexes of all the parts below it, e.g. "quran:1:1" under "quran".
+        """
+        return [
+            row.index
+            for row in db_session.query(self.model.index).filter(
+                (self.model.index == index)
+                | self.model.index.startswith(index + ":", autoescape=True)
+            )
+        ]
+
+    async def get_payloads_by_index_async(
+        self, db: ReadSession, *, indexes: List[str]
+    ) -> Dict[str, bytes]:
+        """
+        Response bodies of the book parts in `indexes` keyed by index, read in one query.
+        """
+        rows = await fetch_all(
+            db,
+            select([self.model.index, self.model.payload]).where(
+                self.model.index.in_(indexes)
+            ),
+        )
+        payloads = {
+            row["index"]: bytes(row["payload"]) for row in rows if row["payload"] is not None
+        }
+        unrendered = [row["index"] for row in rows if row["payload"] is None]
+        if unrendered:
+            for row in await fetch_all(
+                db,
+                select(self.loaded_columns()).where(self.model.index.in_(unrendered)),
+            ):
+                db_obj = self.from_row(row)
+                payloads[db_obj.index] = self.render(db_obj)
+        return payloads
+
+    async def get_verses_by_index_async(
+        self, db: ReadSession, index: str, *, start: int = None, end: int = None
+    ) -> Optional[List[bytes]]:
+        """
+        Encoded verses of `index` whose local_index is within [start, end], with
+        any headings between them, cut out of the stored payload.
+
+        Returns `None` if there is no such book part or it has no verses.
+        """
+        row = await fetch_one(
+            db,
+            select(
+                [self.model.id, self.model.payload, self.model.verse_offsets]
+            ).where(self.model.index == index),
+        )
+        if row is None:
+            return None
+        payload, offsets = row["payload"], row["verse_offsets"]
+        if payload is None or offsets is None:
+            db_obj = await self.get_async(db, row["id"])
+            payload = self.render(db_obj)
+            offsets = verse_offsets(db_obj.data, payload)
+            if offsets is None:
+                return None
+        return slice_verses(bytes(payload), offsets, start=start, end=end)
+
+    def project(
+        self,
+        rendered: Rendered,
+        *,
+        names: Collection[str] = (),
+        langs: Collection[str] = (),
+    ) -> Rendered:
+        """
+        Narrow a verse_list or verse_content response down to the translations
+        named in `names` or written in one of `langs`.
+        """
+        content = json.loads(rendered.body)
+        data = content.get("data")
+        if isinstance(data, dict):
+            for holder in [data] + list(data.get("verses") or []):
+                filter_translations(holder, names=names, langs=langs)
+        body = dump_json(content)
+        etag = rendered.etag
+        if etag:
+            etag = projection_etag(etag, names, langs)
+        return Rendered(
+            etag,
+            body,
+            {encoding: gzip_compress(body) for encoding in PROJECTED_ENCODINGS},
+        )
+
+    def project_validator(
+        self,
+        validator: Validator,
+        *,
+        names: Collection[str] = (),
+        langs: Collection[str] = (),
+    ) -> Validator:
+        """
+        What `project` makes of the validator of a response.
+        """
+        return Validator(
+            projection_etag(validator.etag, names, langs), PROJECTED_ENCODINGS
+        )
+
+    def project_verses(
+        self,
+        verses: List[bytes],
+        *,
+        names: Collection[str] = (),
+        langs: Collection[str] = (),
+    ) -> List[bytes]:
+        """
+        `project` for the encoded verses returned by `get_verses_by_index_async`.
+        """
+        decoded = json.loads(b"[" + b",".join(verses) + b"]")
+        for verse in decoded:
+            filter_translations(verse, names=names, langs=langs)
+        return [dump_json(verse) for verse in decoded]
+
     def upsert(
         self, db_session: Session, *, obj_in: BookPartCreate
     ) -> BookPart:
@@ -58,5 +211,220 @@ class CRUDBookPart(CRUDBase[BookPart, BookPartCreate, BookPartUpdate]):
             
         return book_part
 
+    def upsert_batch(
+        self, db_session: Session, *, objs_in: List[BookPartCreate]
+    ) -> List[str]:
+        rows = {}
+        for obj_in in objs_in:
+            row = jsonable_encoder(obj_in)
+            row["content_hash"] = content_hash(row)
+            rows[row["index"]] = row
+        # rows left without a payload are rendered again even if their content is the same
+        stored = self.get_hashes_by_index(db_session, indexes=list(rows), rendered=True)
+        changed = [
+            row for index, row in rows.items() if stored.get(index) != row["content_hash"]
+        ]
+        if not changed:
+            return []
+
+        dialect = db_session.bind.dialect.name
+        if dialect not in ("postgresql", "sqlite"):
+            for row in changed:
+                self.upsert(db_session, obj_in=BookPartCreate(**row))
+            return [row["index"] for row in changed]
+
+        if dialect == "postgresql":
+            self.copy_merge(db_session, changed)
+        else:
+            db_session.execute(self.upsert_statement(), changed)
+        ids = dict(
+            db_session.query(self.model.index, self.model.id)
+            .filter(self.model.index.in_([row["index"] for row in changed]))
+            .all()
+        )
+
+        # the payloads include the ids, which are only known after the insert
+        derived = [
+            dict(self.derived_values(dict(row, id=ids[row["index"]])), id=ids[row["index"]])
+            for row in changed
+        ]
+        if dialect == "postgresql":
+            self.copy_update(db_session, derived)
+        else:
+            table = self.model.__table__
+            db_session.execute(
+                table.update()
+                .where(table.c.id == bindparam("row_id"))
+                .values({column: bindparam(column) for column in derived[0] if column != "id"}),
+                [dict(row, row_id=row["id"]) for row in derived],
+            )
+        db_session.commit()
+
+        for row in changed:
+            self.invalidate(row["index"])
+        return [row["index"] for row in changed]
+
+    def upsert_statement(self):
+        """
+        Multi row `INSERT ... ON CONFLICT ("index") DO UPDATE`, which both
+        PostgreSQL and SQLite (3.24+) understand.
+        """
+        names = quoted(UPSERT_COLUMNS)
+        values = ", ".join(f":{column}" for column in UPSERT_COLUMNS)
+        return text(
+            f'INSERT INTO "{self.model.__tablename__}" ({names}) VALUES ({values}) '
+            f'ON CONFLICT ("index") DO UPDATE SET {upsert_updates()}'
+        ).bindparams(bindparam("data", type_=JSON))
+
+    def copy_merge(self, db_session: Session, rows: List[dict]) -> None:
+        """
+        PostgreSQL path of `upsert_batch`: COPY the rows into a staging table
+        dropped at commit, then merge it into the table in one statement.
+        """
+        table = self.model.__tablename__
+        names = quoted(UPSERT_COLUMNS)
+        db_session.execute(
+            text(
+                f"CREATE TEMP TABLE bookpart_staging ON COMMIT DROP AS "
+                f'SELECT {names} FROM "{table}" WITH NO DATA'
+            )
+        )
+        copy_into(db_session, "bookpart_staging", self.model.__table__, UPSERT_COLUMNS, rows)
+        db_session.execute(
+            text(
+                f'INSERT INTO "{table}" ({names}) SELECT {names} FROM bookpart_staging '
+                f'ON CONFLICT ("index") DO UPDATE SET {upsert_updates()}'
+            )
+        )
+
+    def copy_update(self, db_session: Session, rows: List[dict]) -> None:
+        """
+        PostgreSQL path of `upsert_batch` for the derived columns: COPY them
+        into a staging table, then update the table from it by id.
+        """
+        table = self.model.__tablename__
+        columns = list(rows[0])
+        db_session.execute(
+            text(
+                f"CREATE TEMP TABLE bookpart_derived ON COMMIT DROP AS "
+                f'SELECT {quoted(columns)} FROM "{table}" WITH NO DATA'
+            )
+        )
+        copy_into(db_session, "bookpart_derived", self.model.__table__, columns, rows)
+        updates = ", ".join(
+            f'"{column}" = staged."{column}"' for column in columns if column != "id"
+        )
+        db_session.execute(
+            text(
+                f'UPDATE "{table}" SET {updates} FROM bookpart_derived AS staged '
+                f'WHERE "{table}".id = staged.id'
+            )
+        )
+
+    def update(
+        self, db_session: Session, *, db_obj: BookPart, obj_in: BookPartUpdate
+    ) -> BookPart:
+        index = db_obj.index
+        db_obj = super().update(db_session, db_obj=db_obj, obj_in=obj_in)
+        self.invalidate(index)
+        self.invalidate(db_obj.index)
+        return db_obj
+
+    def remove(self, db_session: Session, *, id: int) -> BookPart:
+        obj = super().remove(db_session, id=id)
+        self.invalidate(obj.index)
+        return obj
+
+
+def slice_verses(
+    payload: bytes, offsets: List[list], *, start: int = None, end: int = None
+) -> List[bytes]:
+    """
+    Cut the verses numbered `start` to `end` out of `payload` using its `verse_offsets`.
+    """
+    selected = [
+        position
+        for position, (local_index, _, _) in enumerate(offsets)
+        if local_index is not None
+        and (start is None or local_index >= start)
+        and (end is None or local_index <= end)
+    ]
+    if not selected:
+        return []
+    return [
+        payload[verse_start:verse_end]
+        for _, verse_start, verse_end in offsets[selected[0]:selected[-1] + 1]
+    ]
+
+
+UPSERT_COLUMNS = ("index", "kind", "data", "last_updated_id", "content_hash")
+
+
+def quoted(columns: Iterable[str]) -> str:
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def upsert_updates() -> str:
+    return ", ".join(f'"{column}" = excluded."{column}"' for column in UPSERT_COLUMNS[1:])
+
+
+def copy_into(
+    db_session: Session, name: str, table: Table, columns: List[str], rows: List[dict]
+) -> None:
+    """
+    Stream `rows` into the PostgreSQL table `name` with `COPY ... FROM STDIN`,
+    encoding the values by the types of the matching `table` columns.
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(
+            "\t".join(
+                copy_value(row[column], json_column=isinstance(table.c[column].type, JSON))
+                for column in columns
+            )
+        )
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor = db_session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {name} ({quoted(columns)}) FROM STDIN", buffer)
+    finally:
+        cursor.close()
+
+
+def copy_value(value: Any, *, json_column: bool = False) -> str:
+    """
+    `value` in the text format of `COPY`.
+    """
+    if value is None:
+        return "\\N"
+    if json_column:
+        value = json.dumps(value, ensure_ascii=False)
+    elif isinstance(value, bytes):
+        value = "\\x" + value.hex()
+    else:
+        value = str(value)
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def filter_translations(
+    holder: dict, *, names: Collection[str], langs: Collection[str]
+) -> None:
+    """
+    Keep the `translations` of a verse that are named in `names` or written in `langs`.
+    """
+    translations = holder.get("translations") if isinstance(holder, dict) else None
+    if translations:
+        holder["translations"] = [
+            translation
+            for translation in translations
+            if translation.get("name") in names or translation.get("lang") in langs
+        ]
+
 
-book_part = CRUDBookPart(BookPart)
+book_part = CRUDBookPart(BookPart, schemas.BookPart)
@@ -1,21 +1,51 @@
-from typing import Optional
+from typing import Optional, Union
 
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import verify_password, get_password_hash
+from app.schemas.user import UserCreate, UserPrincipal, UserUpdate
+from app.core import config
+from app.core.cache import LRUCache
+from app.core.security import (verify_and_update_password, verify_password,
+                               get_password_hash)
 from app.crud.base import CRUDBase
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    def __init__(self, model):
+        super().__init__(model)
+        # `UserPrincipal`s keyed by user id, so authentication needs no query
+        self.principals = LRUCache(
+            maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL
+        )
+
+    def get_principal(self, db_session: Session, *, id: int) -> Optional[UserPrincipal]:
+        principal = self.principals.get(id)
+        if principal is None:
+            row = (
+                db_session.query(User.id, User.is_active, User.is_superuser)
+                .filter(User.id == id)
+                .first()
+            )
+            if row is None:
+                return None
+            principal = UserPrincipal.from_orm(row)
+            self.principals.set(id, principal)
+        return principal
+
     def get_by_email(self, db_session: Session, *, email: str) -> Optional[User]:
         return db_session.query(User).filter(User.email == email).first()
 
-    def create(self, db_session: Session, *, obj_in: UserCreate) -> User:
+    def create(
+        self, db_session: Session, *, obj_in: UserCreate, hashed_password: str = None
+    ) -> User:
+        """
+        Pass `hashed_password` if the password was already hashed off the request thread.
+        """
         db_obj = User(
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=hashed_password or get_password_hash(obj_in.password),
             full_name=obj_in.full_name,
             is_superuser=obj_in.is_superuser,
         )
@@ -24,6 +54,16 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db_session.refresh(db_obj)
         return db_obj
 
+    def update(self, db_session: Session, *, db_obj: User, obj_in: UserUpdate) -> User:
+        db_obj = super().update(db_session, db_obj=db_obj, obj_in=obj_in)
+        self.principals.invalidate(db_obj.id)
+        return db_obj
+
+    def remove(self, db_session: Session, *, id: int) -> User:
+        obj = super().remove(db_session, id=id)
+        self.principals.invalidate(id)
+        return obj
+
     def authenticate(
         self, db_session: Session, *, email: str, password: str
     ) -> Optional[User]:
@@ -34,10 +74,40 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             return None
         return user
 
-    def is_active(self, user: User) -> bool:
+    async def authenticate_async(
+        self, db_session: Session, *, email: str, password: str
+    ) -> Optional[User]:
+        """
+        `authenticate` with bcrypt run on the password hasher pool, rehashing
+        the stored password if it was hashed with another BCRYPT_ROUNDS.
+        """
+        user = await run_in_threadpool(self.get_by_email, db_session, email=email)
+        if not user:
+            return None
+        verified, new_hash = await verify_and_update_password(
+            password, user.hashed_password
+        )
+        if not verified:
+            return None
+        if new_hash:
+            user = await run_in_threadpool(
+                self.set_password_hash, db_session, user=user, hashed_password=new_hash
+            )
+        return user
+
+    def set_password_hash(
+        self, db_session: Session, *, user: User, hashed_password: str
+    ) -> User:
+        user.hashed_password = hashed_password
+        db_session.add(user)
+        db_session.commit()
+        db_session.refresh(user)
+        return user
+
+    def is_active(self, user: Union[User, UserPrincipal]) -> bool:
         return user.is_active
 
-    def is_superuser(self, user: User) -> bool:
+    def is_superuser(self, user: Union[User, UserPrincipal]) -> bool:
         return user.is_superuser
 
 
@@ -5,6 +5,7 @@ from app.core import config
 # for more details: https://github.com/tiangolo/full-stack-fastapi-postgresql/issues/28
 from app.db import base
 from app.db.base import Base
+from app.db.migrate import add_missing_columns, backfill_derived
 from app.db.session import engine
 from app.schemas.user import UserCreate
 
@@ -14,6 +15,10 @@ def init_db(db_session):
     # But if you don't want to use migrations, create
     # the tables un-commenting the next line
     Base.metadata.create_all(bind=engine)
+    # tables created by an older version lack the derived columns
+    add_missing_columns(engine)
+    backfill_derived(db_session, crud.book)
+    backfill_derived(db_session, crud.book_part)
 
     user = crud.user.get_by_email(db_session, email=config.FIRST_SUPERUSER)
     if not user:
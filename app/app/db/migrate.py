@@ -0,0 +1,73 @@
+import logging
+from typing import List
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.db.base_class import Base
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(engine: Engine) -> List[str]:
+    """
+    Add the columns and indexes of the models that existing tables lack.
+
+    `create_all` only creates missing tables, so a database created before a
+    column was added needs this. New columns are added as nullable, to be
+    filled by `backfill_derived`. Returns the names of what was added.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    quote = engine.dialect.identifier_preparer.quote
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            engine.execute(
+                f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} "
+                f"{column.type.compile(dialect=engine.dialect)}"
+            )
+            added.append(table.name + "." + column.name)
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(bind=engine)
+                added.append(index.name)
+    if added:
+        logger.info("Added %s", ", ".join(added))
+    return added
+
+
+def backfill_derived(db_session: Session, crud: CRUDBase, batch_size: int = 500) -> int:
+    """
+    Fill the derived columns (content hash, payloads) of the rows written
+    before `crud` computed them, committing every `batch_size` rows.
+    Returns the number of rows filled.
+    """
+    model = crud.model
+    if not hasattr(model, "content_hash"):
+        return 0
+    filled = 0
+    while True:
+        rows = (
+            db_session.query(model)
+            .filter(model.content_hash.is_(None))
+            .order_by(model.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        for db_obj in rows:
+            crud.set_derived(db_session, db_obj)
+        db_session.commit()
+        filled += len(rows)
+        logger.info("Filled derived columns of %i %s rows", filled, model.__tablename__)
+    return filled
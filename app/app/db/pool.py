@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+from sqlalchemy.util import queue as sqla_queue
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMonitor:
+    def __init__(self, name: str, url: str, *, samples: int = 1000):
+        """
+        Counts the connections checked out of and back into a pool, and keeps
+        the time the last `samples` checkouts waited for a connection.
+        """
+        self.name = name
+        self.url = url
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidated = 0
+        self._waits: deque = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def checkout(self, *args) -> None:
+        with self._lock:
+            self.checkouts += 1
+
+    def checkin(self, *args) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._waits.append(seconds)
+
+    def record_invalidated(self, count: int) -> None:
+        with self._lock:
+            self.invalidated += count
+
+    def stats(self, pool: Pool) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = {
+                "name": self.name,
+                "url": self.url,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "checked_out": self.checkouts - self.checkins,
+                "invalidated": self.invalidated,
+                "wait_p50": percentile(waits, 50),
+                "wait_p95": percentile(waits, 95),
+                "wait_p99": percentile(waits, 99),
+            }
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                idle=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                timeout=pool.timeout(),
+            )
+        return stats
+
+
+def percentile(values: list, percent: float) -> Optional[float]:
+    """
+    Nearest rank percentile of the sorted `values`.
+    """
+    if not values:
+        return None
+    rank = max(int(round(percent / 100 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class MonitoredQueuePool(QueuePool):
+    """
+    `QueuePool` reporting how long each checkout waited to its `monitor`.
+    """
+
+    monitor: Optional[PoolMonitor] = None
+
+    def _do_get(self):
+        started = time.monotonic()
+        try:
+            return super()._do_get()
+        finally:
+            if self.monitor is not None:
+                self.monitor.record_wait(time.monotonic() - started)
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool, which keeps counting on the same monitor
+        pool = super().recreate()
+        pool.monitor = self.monitor
+        return pool
+
+
+# one per engine, in the order they were created
+pool_monitors: Dict[Engine, PoolMonitor] = {}
+
+
+def monitor_pool(engine: Engine, name: str) -> PoolMonitor:
+    """
+    Count the checkouts of `engine` on a `PoolMonitor` of its own, labelled `name`.
+    """
+    monitor = PoolMonitor(name, repr(engine.url))
+    event.listen(engine, "checkout", monitor.checkout)
+    event.listen(engine, "checkin", monitor.checkin)
+    if isinstance(engine.pool, MonitoredQueuePool):
+        engine.pool.monitor = monitor
+    pool_monitors[engine] = monitor
+    return monitor
+
+
+def validate_pool(engine: Engine) -> int:
+    """
+    Ping each idle connection in the pool once, dropping the dead ones.
+
+    Stands in for `pool_pre_ping`, which pays a round trip on every checkout.
+    Connections are taken off the pool's queue directly, so the pings are not
+    counted as checkouts or waits, and connections in use are left alone.
+    Returns the number of connections dropped.
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return 0
+    invalidated = 0
+    # the queue is FIFO, so taking connections out one at a time visits each idle one
+    for _ in range(pool.checkedin()):
+        try:
+            record = pool._pool.get(False)
+        except sqla_queue.Empty:
+            # the rest were checked out in the meantime
+            break
+        try:
+            if record.connection is not None and not engine.dialect.do_ping(
+                record.connection
+            ):
+                raise ConnectionError("ping failed")
+        except Exception as e:
+            # reconnects on its next checkout
+            record.invalidate(e)
+            invalidated += 1
+        finally:
+            pool._do_return_conn(record)
+    if invalidated:
+        monitor = pool_monitors.get(engine)
+        if monitor is not None:
+            monitor.record_invalidated(invalidated)
+        logger.warning("Dropped %s dead pooled connections of %r", invalidated, engine.url)
+    return invalidated
+
+
+async def validate_pool_periodically(engine: Engine, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(validate_pool, engine)
+        except Exception:
+            logger.exception("Pool validation failed")
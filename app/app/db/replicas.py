@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import threading
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaRouter:
+    def __init__(self, engines: List[Engine]):
+        """
+        Hands out read replica engines in round robin order, skipping the
+        ones ejected for failing a health check or a query until they pass
+        a health check again.
+        """
+        self.engines = engines
+        self.healthy = set(engines)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def choose(self) -> Optional[Engine]:
+        """
+        Next healthy replica, `None` if there is none and reads should go to the primary.
+        """
+        with self._lock:
+            for _ in range(len(self.engines)):
+                engine = self.engines[self._next % len(self.engines)]
+                self._next += 1
+                if engine in self.healthy:
+                    return engine
+        return None
+
+    def eject(self, engine: Engine) -> None:
+        with self._lock:
+            if engine in self.healthy:
+                logger.warning("Ejecting read replica %r", engine.url)
+            self.healthy.discard(engine)
+
+    def check(self) -> None:
+        for engine in self.engines:
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except Exception:
+                self.eject(engine)
+            else:
+                with self._lock:
+                    if engine not in self.healthy:
+                        logger.info("Read replica %r is back", engine.url)
+                    self.healthy.add(engine)
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            return [
+                {"url": repr(engine.url), "healthy": engine in self.healthy}
+                for engine in self.engines
+            ]
+
+
+async def check_replicas_periodically(router: ReplicaRouter, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await run_in_threadpool(router.check)
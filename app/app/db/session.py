@@ -1,10 +1,45 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.orm import scoped_session, sessionmaker
 
 from app.core import config
+from app.db.pool import MonitoredQueuePool, monitor_pool
+from app.db.replicas import ReplicaRouter
 
-engine = create_engine(config.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
+
+def engine_options(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        # SQLite keeps its own pool classes, which take none of these settings
+        return {}
+    return dict(
+        poolclass=MonitoredQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+    )
+
+
+engine = create_engine(
+    config.SQLALCHEMY_DATABASE_URI, **engine_options(config.SQLALCHEMY_DATABASE_URI)
+)
 db_session = scoped_session(
     sessionmaker(autocommit=False, autoflush=False, bind=engine)
 )
 Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+monitor_pool(engine, "primary")
+
+# Read only copies of the primary for the read endpoints, see `get_replica_db`
+replicas = ReplicaRouter(
+    [create_engine(url, **engine_options(url)) for url in config.REPLICA_DATABASE_URLS]
+)
+for number, replica in enumerate(replicas.engines, 1):
+    monitor_pool(replica, "replica " + str(number))
+ReplicaSession = sessionmaker(autocommit=False, autoflush=False)
+
+# Async connection pool for the read endpoints, connected on application startup
+database = None
+if config.ASYNC_DATABASE_ENABLED:
+    import databases
+
+    database = databases.Database(config.ASYNC_DATABASE_URI)
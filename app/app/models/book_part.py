@@ -1,5 +1,6 @@
-from sqlalchemy import JSON, Boolean, Column, ForeignKey, Integer, String
-from sqlalchemy.orm import relationship
+from sqlalchemy import (JSON, Boolean, Column, ForeignKey, Index, Integer,
+                        LargeBinary, String)
+from sqlalchemy.orm import deferred, relationship
 
 from app.db.base_class import Base
 
@@ -9,5 +10,15 @@ class BookPart(Base):
     index = Column(String, index=True, nullable=False, unique=True)
     kind = Column(String, index=True, nullable=False)
     data = Column(JSON)
+    content_hash = Column(String)
+    # response body rendered at write time, only loaded when asked for
+    payload = deferred(Column(LargeBinary))
+    payload_gzip = deferred(Column(LargeBinary))
+    payload_br = deferred(Column(LargeBinary))
+    # byte ranges of data.verses within payload, see `verse_offsets`
+    verse_offsets = deferred(Column(JSON))
     last_updated_id = Column(Integer, ForeignKey("user.id"))
     last_updated = relationship("User")
+
+    # keyset pagination of listings filtered by kind
+    __table_args__ = (Index("ix_bookpart_kind_id", "kind", "id"),)
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, List
 
 from pydantic import BaseModel
 
@@ -47,3 +47,20 @@ class BookPart(BookPartInDBBase):
 # Properties properties stored in DB
 class BookPartInDB(BookPartInDBBase):
     pass
+
+
+# Properties to receive on a batch read
+class BookPartBatchRequest(BaseModel):
+    indexes: List[str]
+
+
+# Properties to return to client for a batch read
+class BookPartBatch(BaseModel):
+    items: List[BookPart]
+    missing: List[str]
+
+
+# Properties to return to client for a verse range
+class BookPartVerses(BaseModel):
+    index: str
+    verses: List[Any]
@@ -0,0 +1,44 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+
+
+class PoolStats(BaseModel):
+    # "primary" or "replica <n>"
+    name: str
+    url: str
+    checkouts: int
+    checkins: int
+    checked_out: int
+    invalidated: int
+    # checkout wait percentiles in seconds
+    wait_p50: Optional[float] = None
+    wait_p95: Optional[float] = None
+    wait_p99: Optional[float] = None
+    # only reported for pooled (non SQLite) databases
+    size: Optional[int] = None
+    idle: Optional[int] = None
+    overflow: Optional[int] = None
+    timeout: Optional[float] = None
+
+
+class PasswordHasherStats(BaseModel):
+    workers: int
+    queued: int
+    running: int
+    completed: int
+    average_wait: float
+    max_wait: float
+
+
+class ReplicaStats(BaseModel):
+    url: str
+    healthy: bool
@@ -37,3 +37,13 @@ class User(UserBaseInDB):
 # Additional properties stored in DB
 class UserInDB(UserBaseInDB):
     hashed_password: str
+
+
+# What authenticated requests need to know about their user, cached per worker
+class UserPrincipal(BaseModel):
+    id: int
+    is_active: bool = True
+    is_superuser: bool = False
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,46 @@
+import pytest
+from fastapi import HTTPException
+
+from app import crud
+from app.api.utils.pagination import (NEXT_CURSOR_HEADER, decode_cursor,
+                                      encode_cursor)
+from app.schemas.book_part import BookPartCreate
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42)) == 42
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+
+def test_invalid_cursor():
+    for cursor in ["not base64!", encode_cursor(1)[:-1] + "*", "YWJj"]:
+        with pytest.raises(HTTPException) as error:
+            decode_cursor(cursor)
+        assert error.value.status_code == 400
+
+
+def test_next_cursor_pages_through_all_rows(db, client):
+    kind = "test_cursor"
+    indexes = [f"test-cursor:{number}" for number in range(5)]
+    crud.book_part.upsert_batch(
+        db,
+        objs_in=[
+            BookPartCreate(kind=kind, index=index, data={}, last_updated_id=1)
+            for index in indexes
+        ],
+    )
+
+    seen, params = [], {"kind": kind, "limit": 2}
+    while True:
+        response = client.get("/api/v1/bookparts/", params=params)
+        assert response.status_code == 200
+        seen.extend(part["index"] for part in response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+        params["cursor"] = cursor
+    assert seen == indexes
+
+    response = client.get("/api/v1/bookparts/", params={"cursor": "YWJj"})
+    assert response.status_code == 400
@@ -0,0 +1,95 @@
+from app import crud
+from app.api.utils.etag import etag_matches
+from app.api.utils.responses import negotiate_encoding, not_modified_response
+from app.core.encoders import Validator
+from app.schemas.book_part import BookPartCreate
+
+ETAG = '"1-abc"'
+
+
+def test_etag_matches():
+    assert etag_matches(ETAG, ETAG)
+    assert etag_matches("W/" + ETAG, ETAG)
+    assert etag_matches('"2-def", ' + ETAG, ETAG)
+    assert etag_matches('"2-def", W/"1-abc-gzip"', ETAG)
+    assert etag_matches("*", ETAG)
+
+
+def test_etag_does_not_match():
+    assert not etag_matches(None, ETAG)
+    assert not etag_matches(ETAG, None)
+    assert not etag_matches('"1-abcd"', ETAG)
+    assert not etag_matches('"2-def", W/"1-ab"', ETAG)
+
+
+def test_negotiate_encoding():
+    available = {"gzip": b"", "br": b""}
+    assert negotiate_encoding("gzip, deflate, br", available) == "br"
+    assert negotiate_encoding("br;q=0, gzip", available) == "gzip"
+    assert negotiate_encoding("gzip;q=0", available) is None
+    assert negotiate_encoding("*", available) == "br"
+    assert negotiate_encoding("*, br;q=0", available) == "gzip"
+    assert negotiate_encoding("identity", available) is None
+    assert negotiate_encoding(None, available) is None
+
+
+def test_negotiate_encoding_without_brotli():
+    # payload_br is not stored when brotli is not installed
+    assert negotiate_encoding("br, gzip", {"gzip": b""}) == "gzip"
+    assert negotiate_encoding("br", {"gzip": b""}) is None
+    assert negotiate_encoding("br, gzip", {}) is None
+
+
+def test_not_modified_response():
+    validator = Validator(ETAG, ("gzip",))
+    assert not_modified_response(validator, if_none_match='"2-def"') is None
+    assert not_modified_response(None, if_none_match=ETAG) is None
+
+    response = not_modified_response(
+        validator, if_none_match=ETAG, accept_encoding="gzip"
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"1-abc-gzip"'
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+    response = not_modified_response(Validator(ETAG), if_none_match=ETAG)
+    assert response.headers["ETag"] == ETAG
+    assert "Vary" not in response.headers
+
+
+def test_not_modified_carries_the_full_response_etag(db, client):
+    crud.book_part.upsert(
+        db,
+        obj_in=BookPartCreate(
+            kind="verse_list",
+            index="test-etag:1",
+            data={
+                "verses": [
+                    {
+                        "local_index": 1,
+                        "text": "a",
+                        "translations": [{"name": "sahih", "lang": "en", "text": "b"}],
+                    }
+                ]
+            },
+            last_updated_id=1,
+        ),
+    )
+    url = "/api/v1/bookparts/test-etag:1"
+    for query in ["", "?translations=sahih"]:
+        for accept_encoding in ["", "gzip", "br"]:
+            headers = {"Accept-Encoding": accept_encoding}
+            crud.book_part.cache.clear()
+            etag = client.get(url + query, headers=headers).headers["ETag"]
+            conditional = {**headers, "If-None-Match": etag}
+
+            # answered from the cached response
+            response = client.get(url + query, headers=conditional)
+            assert response.status_code == 304
+            assert response.headers["ETag"] == etag
+
+            # and from the stored ETag alone
+            crud.book_part.cache.clear()
+            response = client.get(url + query, headers=conditional)
+            assert response.status_code == 304
+            assert response.headers["ETag"] == etag
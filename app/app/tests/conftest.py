@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+import pytest
+
+# app.core.config reads the environment on import, so the tests default to a
+# throwaway SQLite database when DATABASE_URL is not set, and to a project
+# name, which the app needs for its OpenAPI schema
+os.environ.setdefault(
+    "DATABASE_URL",
+    "sqlite:///"
+    + os.path.join(tempfile.mkdtemp(), "test.db")
+    + "?check_same_thread=False",
+)
+os.environ.setdefault("PROJECT_NAME", "ThaqalaynApi")
+
+
+@pytest.fixture(scope="session")
+def db():
+    from app.db.base import Base
+    from app.db.session import Session, engine
+
+    Base.metadata.create_all(bind=engine)
+    session = Session()
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="session")
+def client(db):
+    from starlette.testclient import TestClient
+
+    from main import app
+
+    return TestClient(app)
@@ -0,0 +1,25 @@
+from app import crud
+from app.core.encoders import render_json
+from app.schemas.book import Book, BookCreate, BookUpdate
+
+
+def test_create_book(db):
+    book_in = BookCreate(kind="book", index="test-create", data={"title": "Kafi"})
+    book = crud.book.create(db_session=db, obj_in=book_in)
+    assert book.index == "test-create"
+    assert book.data == {"title": "Kafi"}
+    assert book.content_hash is not None
+    # Book needs a last_updated_id, so the response is rendered on read instead
+    assert book.payload is None
+
+
+def test_create_book_by_user_renders_payload(db):
+    book_in = BookCreate(kind="book", index="test-create-by-user", data={"title": "Kafi"})
+    book = crud.book.create_by_user(db_session=db, obj_in=book_in, user_id=1)
+    assert book.payload == render_json(Book.from_orm(book))
+
+    book = crud.book.update(
+        db_session=db, db_obj=book, obj_in=BookUpdate(**dict(book_in.dict(), data={"title": "Al-Kafi"}))
+    )
+    assert book.payload == render_json(Book.from_orm(book))
+    assert b"Al-Kafi" in book.payload
@@ -0,0 +1,35 @@
+from app import crud
+from app.schemas.book_part import BookPartCreate
+
+
+def verse_list(index: str, text: str) -> BookPartCreate:
+    return BookPartCreate(
+        kind="verse_list",
+        index=index,
+        data={"verses": [{"local_index": 1, "text": text}]},
+        last_updated_id=1,
+    )
+
+
+def test_upsert_batch_skips_unchanged(db):
+    parts = [verse_list("test-upsert:1", "a"), verse_list("test-upsert:2", "b")]
+    assert crud.book_part.upsert_batch(db, objs_in=parts) == [
+        "test-upsert:1",
+        "test-upsert:2",
+    ]
+    assert crud.book_part.upsert_batch(db, objs_in=parts) == []
+
+    parts[1] = verse_list("test-upsert:2", "c")
+    assert crud.book_part.upsert_batch(db, objs_in=parts) == ["test-upsert:2"]
+
+
+def test_upsert_batch_renders_missing_payload(db):
+    part = verse_list("test-upsert-unrendered", "a")
+    crud.book_part.upsert_batch(db, objs_in=[part])
+    db_obj = crud.book_part.get_by_index(db, part.index)
+    db_obj.payload = None
+    db.commit()
+
+    assert crud.book_part.upsert_batch(db, objs_in=[part]) == [part.index]
+    db.refresh(db_obj)
+    assert db_obj.payload == crud.book_part.render(db_obj)
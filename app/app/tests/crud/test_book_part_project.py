@@ -0,0 +1,64 @@
+import gzip
+import json
+
+from app import crud
+from app.core.encoders import Rendered, Validator, dump_json
+from app.crud.crud_book_part import filter_translations
+
+TRANSLATIONS = [
+    {"name": "sahih", "lang": "en", "text": "a"},
+    {"name": "ansarian", "lang": "fa", "text": "b"},
+    {"name": "pickthall", "lang": "en", "text": "c"},
+]
+
+
+def test_filter_translations_by_name_or_lang():
+    verse = {"translations": list(TRANSLATIONS)}
+    filter_translations(verse, names={"ansarian"}, langs=set())
+    assert verse["translations"] == TRANSLATIONS[1:2]
+
+    verse = {"translations": list(TRANSLATIONS)}
+    filter_translations(verse, names={"ansarian"}, langs={"en"})
+    assert verse["translations"] == TRANSLATIONS
+
+    verse = {"translations": list(TRANSLATIONS)}
+    filter_translations(verse, names={"unknown"}, langs=set())
+    assert verse["translations"] == []
+
+
+def test_filter_translations_leaves_other_holders():
+    heading = {"text": "a"}
+    filter_translations(heading, names={"sahih"}, langs=set())
+    assert heading == {"text": "a"}
+    filter_translations(None, names={"sahih"}, langs=set())
+
+
+def test_project():
+    content = {
+        "index": "test:1",
+        "data": {
+            "translations": list(TRANSLATIONS),
+            "verses": [{"text": "x", "translations": list(TRANSLATIONS)}],
+        },
+    }
+    rendered = Rendered('"1-abc"', dump_json(content))
+
+    projected = crud.book_part.project(rendered, names=("sahih",), langs=())
+    data = json.loads(projected.body)["data"]
+    assert data["translations"] == TRANSLATIONS[:1]
+    assert data["verses"][0]["translations"] == TRANSLATIONS[:1]
+    assert gzip.decompress(projected.encoded["gzip"]) == projected.body
+
+    assert projected.etag.startswith('"1-abc-')
+    assert projected.etag == crud.book_part.project(rendered, names=["sahih"]).etag
+    assert projected.etag != crud.book_part.project(rendered, langs=["en"]).etag
+    assert crud.book_part.project_validator(
+        Validator(rendered.etag), names=("sahih",)
+    ) == Validator(projected.etag, tuple(projected.encoded))
+
+
+def test_project_without_etag():
+    rendered = Rendered(None, dump_json({"data": {"chapters": []}}))
+    projected = crud.book_part.project(rendered, langs=("en",))
+    assert projected.etag is None
+    assert json.loads(projected.body) == {"data": {"chapters": []}}
@@ -0,0 +1,46 @@
+import json
+
+from app.core.encoders import dump_json, verse_offsets
+from app.crud.crud_book_part import slice_verses
+
+DATA = {
+    "verses": [
+        {"local_index": 1, "text": "بِسْمِ ٱللَّهِ"},
+        {"part_type": "Heading", "text": "باب"},
+        {"local_index": 2, "text": "ٱلْحَمْدُ لِلَّهِ"},
+        {"local_index": 3, "text": "c"},
+    ]
+}
+
+
+def rendered():
+    payload = dump_json({"index": "test:1", "kind": "verse_list", "data": DATA})
+    return payload, verse_offsets(DATA, payload)
+
+
+def test_verse_offsets_are_byte_offsets():
+    payload, offsets = rendered()
+    assert [local_index for local_index, _, _ in offsets] == [1, None, 2, 3]
+    for verse, (_, start, end) in zip(DATA["verses"], offsets):
+        assert json.loads(payload[start:end]) == verse
+
+
+def test_verse_offsets_without_verses():
+    assert verse_offsets({"chapters": []}, b'{"data":{"chapters":[]}}') is None
+    assert verse_offsets(DATA, dump_json({"data": {"verses": []}})) is None
+
+
+def test_slice_verses_keeps_headings_in_range():
+    payload, offsets = rendered()
+    verses = slice_verses(payload, offsets, start=1, end=2)
+    assert [json.loads(verse) for verse in verses] == DATA["verses"][:3]
+    verses = slice_verses(payload, offsets, start=2)
+    assert [json.loads(verse) for verse in verses] == DATA["verses"][2:]
+    assert len(slice_verses(payload, offsets)) == len(DATA["verses"])
+
+
+def test_slice_verses_empty_range():
+    payload, offsets = rendered()
+    assert slice_verses(payload, offsets, start=3, end=2) == []
+    assert slice_verses(payload, offsets, start=10) == []
+    assert slice_verses(payload, offsets, end=0) == []
@@ -0,0 +1,45 @@
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.db.migrate import add_missing_columns, backfill_derived
+
+# the book tables as the first release created them
+OLD_TABLES = [
+    'CREATE TABLE {} (id INTEGER PRIMARY KEY, "index" VARCHAR NOT NULL UNIQUE, '
+    "kind VARCHAR NOT NULL, data JSON, last_updated_id INTEGER)".format(table)
+    for table in ("book", "bookpart")
+]
+
+
+def test_upgrade_old_database(tmp_path):
+    engine = create_engine("sqlite:///" + str(tmp_path / "old.db"))
+    for statement in OLD_TABLES:
+        engine.execute(statement)
+    engine.execute(
+        """INSERT INTO bookpart ("index", kind, data, last_updated_id) """
+        """VALUES ('quran:1', 'verse_list', '{"verses": [{"local_index": 1}]}', 1)"""
+    )
+    engine.execute(
+        """INSERT INTO book ("index", kind, data, last_updated_id) """
+        """VALUES ('quran', 'book', '{"title": "Quran"}', 1)"""
+    )
+
+    added = add_missing_columns(engine)
+    assert "bookpart.payload_br" in added
+    assert "book.content_hash" in added
+    assert "ix_bookpart_kind_id" in added
+    columns = {column["name"] for column in inspect(engine).get_columns("bookpart")}
+    assert {"content_hash", "payload", "payload_gzip", "verse_offsets"} <= columns
+    assert add_missing_columns(engine) == []
+
+    db = sessionmaker(bind=engine)()
+    assert backfill_derived(db, crud.book_part) == 1
+    assert backfill_derived(db, crud.book) == 1
+    assert backfill_derived(db, crud.book_part) == 0
+
+    book_part = crud.book_part.get_by_index(db, "quran:1")
+    assert book_part.content_hash is not None
+    assert book_part.payload == crud.book_part.render(book_part)
+    assert book_part.verse_offsets is not None
+    db.close()
@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.db import pool as pool_module
+from app.db.pool import MonitoredQueuePool, monitor_pool, validate_pool
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(pool_module, "pool_monitors", {})
+    engine = create_engine(
+        "sqlite:///" + str(tmp_path / "pool.db"),
+        poolclass=MonitoredQueuePool,
+        pool_size=2,
+        max_overflow=0,
+        pool_timeout=5,
+    )
+    yield engine
+    engine.dispose()
+
+
+def query(engine) -> None:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+def counted(stats: dict) -> tuple:
+    return stats["checkouts"], stats["checkins"], stats["wait_p99"]
+
+
+def test_monitors_are_per_engine(engine, tmp_path):
+    other = create_engine(
+        "sqlite:///" + str(tmp_path / "other.db"), poolclass=MonitoredQueuePool
+    )
+    monitor = monitor_pool(engine, "primary")
+    other_monitor = monitor_pool(other, "replica 1")
+    query(engine)
+    query(engine)
+    query(other)
+    assert monitor.stats(engine.pool)["checkouts"] == 2
+    assert other_monitor.stats(other.pool)["checkouts"] == 1
+    assert other_monitor.stats(other.pool)["name"] == "replica 1"
+    assert pool_module.pool_monitors == {engine: monitor, other: other_monitor}
+
+
+def test_validate_pool_is_not_counted(engine):
+    monitor = monitor_pool(engine, "primary")
+    connections = [engine.connect(), engine.connect()]
+    for connection in connections:
+        connection.close()
+    before = counted(monitor.stats(engine.pool))
+
+    assert validate_pool(engine) == 0
+    assert counted(monitor.stats(engine.pool)) == before
+    assert engine.pool.checkedin() == 2
+
+
+def test_validate_pool_skips_busy_connections(engine):
+    monitor_pool(engine, "primary")
+    idle = engine.connect()
+    idle.close()
+    busy = engine.connect()
+    assert validate_pool(engine) == 0
+    assert engine.pool.checkedout() == 1
+    busy.close()
+
+
+def test_validate_pool_drops_dead_connections(engine):
+    monitor = monitor_pool(engine, "primary")
+    connection = engine.connect()
+    dbapi_connection = connection.connection.connection
+    connection.close()
+    dbapi_connection.close()
+
+    assert validate_pool(engine) == 1
+    assert monitor.stats(engine.pool)["invalidated"] == 1
+    query(engine)
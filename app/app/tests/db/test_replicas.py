@@ -0,0 +1,135 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.api.utils import db as db_utils
+from app.core.cache import LRUCache
+from app.db.replicas import ReplicaRouter
+
+
+def sqlite_engine(path):
+    return create_engine("sqlite:///" + str(path))
+
+
+def create_database(path, name: str):
+    engine = sqlite_engine(path)
+    with engine.connect() as connection:
+        connection.execute(text("CREATE TABLE origin (name VARCHAR)"))
+        connection.execute(text("INSERT INTO origin VALUES (:name)"), name=name)
+    return engine
+
+
+def origin(db) -> str:
+    return db.execute(text("SELECT name FROM origin")).scalar()
+
+
+@pytest.fixture
+def primary(tmp_path):
+    return create_database(tmp_path / "primary.db", "primary")
+
+
+@pytest.fixture
+def replica(tmp_path):
+    return create_database(tmp_path / "replica.db", "replica")
+
+
+@pytest.fixture
+def unreachable(tmp_path):
+    # SQLite cannot open a file in a directory that does not exist
+    return sqlite_engine(tmp_path / "down" / "replica.db")
+
+
+@pytest.fixture
+def use_router(monkeypatch, primary):
+    def use(router: ReplicaRouter) -> ReplicaRouter:
+        monkeypatch.setattr(db_utils, "replicas", router)
+        monkeypatch.setattr(db_utils, "Session", sessionmaker(bind=primary))
+        return router
+
+    return use
+
+
+def read() -> str:
+    """
+    Where a request through `get_replica_db` reads from.
+    """
+    dependency = db_utils.get_replica_db()
+    db = next(dependency)
+    try:
+        name = origin(db)
+    except OperationalError as e:
+        with pytest.raises(OperationalError):
+            dependency.throw(e)
+        raise
+    dependency.close()
+    return name
+
+
+def test_choose_round_robin(replica):
+    other = sqlite_engine(replica.url.database)
+    router = ReplicaRouter([replica, other])
+    assert [router.choose() for _ in range(4)] == [replica, other, replica, other]
+
+
+def test_choose_skips_ejected(replica):
+    other = sqlite_engine(replica.url.database)
+    router = ReplicaRouter([replica, other])
+    router.eject(replica)
+    assert [router.choose() for _ in range(3)] == [other, other, other]
+    router.eject(other)
+    assert router.choose() is None
+
+
+def test_get_replica_db_reads_replica(use_router, replica):
+    use_router(ReplicaRouter([replica]))
+    assert read() == "replica"
+
+
+def test_get_replica_db_ejects_on_operational_error(use_router, replica, unreachable):
+    router = use_router(ReplicaRouter([unreachable, replica]))
+    with pytest.raises(OperationalError):
+        read()
+    assert router.healthy == {replica}
+    assert [read() for _ in range(2)] == ["replica", "replica"]
+
+
+def test_get_replica_db_falls_back_to_primary(use_router, replica):
+    router = use_router(ReplicaRouter([replica]))
+    router.eject(replica)
+    assert read() == "primary"
+
+
+def test_get_replica_db_without_replicas(use_router):
+    use_router(ReplicaRouter([]))
+    assert read() == "primary"
+
+
+def test_check_readmits_recovered_replica(tmp_path, use_router, unreachable):
+    router = use_router(ReplicaRouter([unreachable]))
+    router.check()
+    assert router.healthy == set()
+    assert read() == "primary"
+
+    (tmp_path / "down").mkdir()
+    create_database(tmp_path / "down" / "replica.db", "replica")
+    router.check()
+    assert router.healthy == {unreachable}
+    assert read() == "replica"
+    assert router.stats() == [{"url": repr(unreachable.url), "healthy": True}]
+
+
+def test_recently_written_book_part_reads_primary(monkeypatch, use_router, replica):
+    monkeypatch.setattr(
+        crud.book_part, "recently_written", LRUCache(maxsize=10, ttl=60)
+    )
+    use_router(ReplicaRouter([replica]))
+    crud.book_part.invalidate("quran:1")
+
+    dependency = db_utils.get_book_part_read_db("quran:1")
+    assert origin(next(dependency)) == "primary"
+    dependency.close()
+    dependency = db_utils.get_book_part_read_db("quran:2")
+    assert origin(next(dependency)) == "replica"
+    dependency.close()
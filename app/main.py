@@ -1,11 +1,15 @@
+import asyncio
+
 from fastapi import FastAPI
-from fastapi.middleware.gzip import GZipMiddleware
 from starlette.middleware.cors import CORSMiddleware
-from starlette.requests import Request
 
 from app.api.api_v1.api import api_router
+from app.api.utils.pagination import NEXT_CURSOR_HEADER
 from app.core import config
-from app.db.session import Session
+from app.core.middleware import GZipMiddleware
+from app.db.pool import validate_pool_periodically
+from app.db.replicas import check_replicas_periodically
+from app.db.session import database, engine, replicas
 
 app = FastAPI(title=config.PROJECT_NAME, openapi_url="/api/v1/openapi.json")
 
@@ -24,6 +28,7 @@ if config.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
     ),
 
 app.add_middleware(GZipMiddleware)
@@ -31,9 +36,35 @@ app.add_middleware(GZipMiddleware)
 app.include_router(api_router, prefix=config.API_V1_STR)
 
 
-@app.middleware("http")
-async def db_session_middleware(request: Request, call_next):
-    request.state.db = Session()
-    response = await call_next(request)
-    request.state.db.close()
-    return response
+background_tasks = []
+
+
+@app.on_event("startup")
+async def connect_database():
+    if database is not None:
+        await database.connect()
+    if config.DB_POOL_VALIDATE_INTERVAL:
+        # replicas lost pool_pre_ping along with the primary
+        for pooled in [engine, *replicas.engines]:
+            background_tasks.append(
+                asyncio.ensure_future(
+                    validate_pool_periodically(
+                        pooled, config.DB_POOL_VALIDATE_INTERVAL
+                    )
+                )
+            )
+    if replicas.engines and config.REPLICA_CHECK_INTERVAL:
+        background_tasks.append(
+            asyncio.ensure_future(
+                check_replicas_periodically(replicas, config.REPLICA_CHECK_INTERVAL)
+            )
+        )
+
+
+@app.on_event("shutdown")
+async def disconnect_database():
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    if database is not None:
+        await database.disconnect()
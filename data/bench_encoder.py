@@ -0,0 +1,107 @@
+"""
+Times encoding the book parts of a Quran sized tree with `jsonable_encoder`,
+as the ingestion used to, against `data.lib_encoder`, and checks they agree.
+
+	python -m data.bench_encoder
+"""
+import logging
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from data.lib_encoder import chapter_list, encode
+from data.lib_model import has_chapters, has_verses, set_index
+from data.models import Chapter, Crumb, Language, PartType, Translation, Verse
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SURAS = 114
+VERSES = 6236
+TRANSLATIONS = 28
+
+
+def build_book() -> Chapter:
+	book = Chapter()
+	book.index = "bench"
+	book.path = "/books/bench"
+	book.verse_start_index = 0
+	book.part_type = PartType.Book
+	book.titles = {Language.EN.value: "Bench"}
+	book.chapters = []
+	per_chapter = VERSES // SURAS
+	for number in range(SURAS):
+		chapter = Chapter()
+		chapter.part_type = PartType.Chapter
+		chapter.titles = {Language.EN.value: "Chapter " + str(number + 1), Language.AR.value: "سورة"}
+		chapter.verses = []
+		for verse_number in range(per_chapter):
+			verse = Verse()
+			verse.part_type = PartType.Verse
+			verse.text = "آية " + str(verse_number)
+			verse.translations = []
+			for translator in range(TRANSLATIONS):
+				translation = Translation()
+				translation.name = "translator" + str(translator)
+				translation.lang = Language.EN.value
+				translation.text = "Translation of verse " + str(verse_number)
+				verse.translations.append(translation)
+			chapter.verses.append(verse)
+		book.chapters.append(chapter)
+
+	crumb = Crumb()
+	crumb.titles = book.titles
+	crumb.indexed_titles = book.titles
+	crumb.path = book.path
+	book.crumbs = [crumb]
+	set_index(book, [0, 0], 0)
+	return book
+
+
+def generic_parts(book: Chapter) -> list:
+	"""
+	The book parts as encoded before, the whole subtree for a chapter list.
+	"""
+	parts = []
+	if has_chapters(book):
+		book_data = jsonable_encoder(book)
+		for chapter in book_data['chapters']:
+			chapter.pop('chapters', None)
+			chapter.pop('verses', None)
+		parts.append(book_data)
+		for chapter in book.chapters:
+			parts.extend(generic_parts(chapter))
+	if has_verses(book):
+		parts.append(jsonable_encoder(book))
+	return parts
+
+
+def fast_parts(book: Chapter) -> list:
+	parts = []
+	if has_chapters(book):
+		parts.append(chapter_list(book))
+		for chapter in book.chapters:
+			parts.extend(fast_parts(chapter))
+	if has_verses(book):
+		parts.append(encode(book))
+	return parts
+
+
+def timed(function, book: Chapter):
+	start = time.perf_counter()
+	parts = function(book)
+	return parts, time.perf_counter() - start
+
+
+def main():
+	book = build_book()
+	generic, generic_time = timed(generic_parts, book)
+	fast, fast_time = timed(fast_parts, book)
+	logger.info("%i book parts: jsonable_encoder %.2fs, lib_encoder %.2fs, %.1fx",
+		len(fast), generic_time, fast_time, generic_time / fast_time)
+	if generic != fast:
+		logger.error("lib_encoder output differs from jsonable_encoder")
+
+
+if __name__ == "__main__":
+	main()
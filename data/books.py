@@ -27,7 +27,7 @@ logger = logging.getLogger(__name__)
 BOOK_INDEX = "books"
 BOOK_PATH = "/books/"
 
-def init_books(db_session: Session):
+def books_part() -> BookPartCreate:
 	data_root = {
 		"titles": {
 			Language.EN.value: "Books",
@@ -55,11 +55,13 @@ def init_books(db_session: Session):
 		]
 	}
 
-	obj_in = BookPartCreate (
+	return BookPartCreate (
 		index = BOOK_INDEX,
 		kind = "chapter_list",
 		data = data_root,
 		last_updated_id = 1
 	)
-	book = crud.book_part.upsert(db_session, obj_in=obj_in)
+
+def init_books(db_session: Session):
+	book = crud.book_part.upsert(db_session, obj_in=books_part())
 	logger.info("Inserted books list into book_part ID %i with index %s", book.id, book.index)
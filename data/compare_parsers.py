@@ -0,0 +1,105 @@
+"""
+Parses the fixtures below and every Al-Kafi volume with both hubeali backends,
+checks that they give the same results and reports the speedup of lxml per volume.
+
+	python -m data.compare_parsers
+"""
+import json
+import logging
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from data.kafi import (VOLUMES, build_volume, get_contents, is_newline, is_tag,
+                       parse_html)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+XHTML_START = """<?xml version="1.0" encoding="utf-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml"><head><title>t</title></head>
+<body>
+"""
+XHTML_END = """
+</body></html>"""
+
+# edge cases the volumes may not cover
+FIXTURES = {
+	"markup": XHTML_START + """<h1><a id="c0">Chapter 1 &#150; Title</a></h1>
+<p class="first-in-chapter  x" dir="rtl">&#1581; <!-- note --> <span style="font-weight: bold" title='say "hi"'>b&#151;</span> &amp; x<br/><a id="q"/><img src="a.png" alt="a &amp; b"/></p>
+<!-- between -->
+<p style="text-align: justify">Hadith &lt;ok&gt; <span xml:lang="ar" class="a  b">x</span><a id="_ftnref0"/><sup>[0]</sup>  <sup>[1]</sup></p>
+<p class="section-break">*</p>
+""" + XHTML_END,
+	"entities": """<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.1//EN" "http://www.w3.org/TR/xhtml11/DTD/xhtml11.dtd">
+""" + XHTML_START.split("\n", 1)[1] + """<h1><a id="c1">Chapter&nbsp;2</a></h1>
+<p class="first-in-chapter" dir="rtl">a&nbsp;b <span style="font-weight: bold">c&nbsp;</span>&mdash;</p>
+<p style="text-align: justify">Hadith&nbsp;text<a id="_ftnref1"/><sup>[1]</sup></p>
+""" + XHTML_END,
+}
+
+
+def walk(soup) -> list:
+	"""
+	What the hubeali parsers read from a file: the heading, the table of contents
+	title and the elements from the first paragraph of the chapter on.
+	"""
+	seen = [get_contents(soup.body.h1), soup.body.h1.get_text(strip=True), get_contents(soup.body.contents[-2])]
+	element = soup.find('p', 'first-in-chapter')
+	while element:
+		if is_newline(element) or not is_tag(element):
+			seen.append(str(element))
+		else:
+			seen.append((element.name, element.attrs, get_contents(element), element.get_text(strip=True)))
+		element = element.next_sibling
+	return seen
+
+
+def compare_fixtures() -> bool:
+	identical = True
+	for name, file_html in FIXTURES.items():
+		same = walk(parse_html(file_html, "html.parser")) == walk(parse_html(file_html, "lxml"))
+		identical = identical and same
+		logger.info("Fixture %s: %s", name, "identical" if same else "DIFFERENT")
+	return identical
+
+
+def parse_volume(volume, parser: str):
+	start = time.perf_counter()
+	chapter = build_volume(*volume, parser=parser)
+	elapsed = time.perf_counter() - start
+	return json.dumps(jsonable_encoder(chapter), ensure_ascii=False, sort_keys=True), elapsed
+
+
+def compare(volumes) -> bool:
+	identical = True
+	soup_total = 0.0
+	lxml_total = 0.0
+	for volume in volumes:
+		soup_json, soup_time = parse_volume(volume, "html.parser")
+		lxml_json, lxml_time = parse_volume(volume, "lxml")
+		soup_total += soup_time
+		lxml_total += lxml_time
+
+		same = soup_json == lxml_json
+		identical = identical and same
+		logger.info("%s: %s, html.parser %.2fs, lxml %.2fs, %.1fx",
+			volume[1], "identical" if same else "DIFFERENT", soup_time, lxml_time, soup_time / lxml_time)
+
+	logger.info("Total: html.parser %.2fs, lxml %.2fs, %.1fx", soup_total, lxml_total, soup_total / lxml_total)
+	return identical
+
+
+def main():
+	if not compare_fixtures():
+		logger.error("lxml output differs from html.parser")
+		sys.exit(1)
+	if not compare(VOLUMES):
+		logger.error("lxml output differs from html.parser")
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
@@ -6,12 +6,12 @@ import os
 import re
 import sqlite3
 import xml.etree.ElementTree
+from concurrent.futures import ProcessPoolExecutor
 from pprint import pprint
 from sqlite3 import Error
 from typing import Dict, List
 
 from bs4 import BeautifulSoup, NavigableString, Tag
-from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
 from app import crud
@@ -23,8 +23,15 @@ from app.db import base
 from app.db.base import Base
 from app.db.session import engine
 from app.schemas.book_part import BookPartCreate
-from data.kafi_corrections import file_correction
-from data.lib_db import insert_chapter
+from data import lib_lxml
+from data.kafi_corrections import (CORRECTION_COUNTS, CORRECTION_ENGINE,
+                                   CORRECTIONS, file_correction,
+                                   unmatched_corrections)
+from data.lib_cache import (MODEL_FILES, code_digest, code_version, digest,
+                            load_cached, source_digests, store_cached)
+from data.lib_lxml import LxmlString, LxmlTag, parse_xhtml
+from data.lib_db import chapter_parts, insert_chapter
+from data.lib_json import dump_json, dump_ndjson
 from data.lib_model import SEQUENCE_ERRORS, set_index
 from data.models import (Chapter, Crumb, Language, PartType, Quran,
                          Translation, Verse)
@@ -185,8 +192,22 @@ def is_book_ending(element: Tag) -> bool:
 def is_chapter_title(element: Tag) -> bool:
 	return element.has_attr('style') and "font-weight: bold" in element['style'] and "text-decoration: underline" in element['style']
 
+def is_tag(element) -> bool:
+	return isinstance(element, (Tag, LxmlTag))
+
 def is_newline(element) -> bool:
-	return isinstance(element, NavigableString) and WHITESPACE_PATTERN.match(element)
+	return isinstance(element, (NavigableString, LxmlString)) and WHITESPACE_PATTERN.match(element)
+
+def parse_html(file_html: str, parser: str):
+	"""
+	Document tree of `file_html`, built by lxml when `parser` is "lxml" and the file
+	is well formed, otherwise by BeautifulSoup.
+	"""
+	if parser == "lxml":
+		root = parse_xhtml(file_html)
+		if root is not None:
+			return root
+	return BeautifulSoup(file_html, 'html.parser')
 
 def add_hadith(chapter: Chapter, hadith_ar: List[str], hadith_en: List[str], part_type: PartType = PartType.Hadith):
 	hadith = Verse()
@@ -207,7 +228,7 @@ def add_hadith(chapter: Chapter, hadith_ar: List[str], hadith_en: List[str], par
 	chapter.verses.append(hadith)
 
 
-def build_hubeali_books(dirname) -> List[Chapter]:
+def build_hubeali_books(dirname, parser: str = config.DATA_HTML_PARSER) -> List[Chapter]:
 	books: List[Chapter] = []
 	logger.info("Adding Al-Kafi dir %s", dirname)
 
@@ -226,7 +247,7 @@ def build_hubeali_books(dirname) -> List[Chapter]:
 		with open(cfile, 'r', encoding='utf8') as qfile:
 			file_html = qfile.read()
 			file_html = file_correction(cfile, file_html)
-			soup = BeautifulSoup(file_html, 'html.parser')
+			soup = parse_html(file_html, parser)
 
 			heading = soup.body.h1
 			if we_dont_care(heading):
@@ -277,8 +298,7 @@ def build_hubeali_books(dirname) -> List[Chapter]:
 					last_element = last_element.next_sibling
 					continue
 
-				is_tag = isinstance(last_element, Tag)
-				is_paragraph = is_tag and last_element.name == 'p'
+				is_paragraph = is_tag(last_element) and last_element.name == 'p'
 				is_not_section_break_paragraph = is_paragraph and not is_section_break_tag(last_element)
 				is_arabic = is_arabic_tag(last_element)
 
@@ -328,7 +348,7 @@ def build_hubeali_books(dirname) -> List[Chapter]:
 
 	return books
 
-def build_hubeali_book_8(dirname) -> List[Chapter]:
+def build_hubeali_book_8(dirname, parser: str = config.DATA_HTML_PARSER) -> List[Chapter]:
 	logger.info("Adding Al-Kafi dir %s", dirname)
 
 	cfiles = glob.glob(dirname + "c*.xhtml")
@@ -356,7 +376,7 @@ def build_hubeali_book_8(dirname) -> List[Chapter]:
 		with open(cfile, 'r', encoding='utf8') as qfile:
 			file_html = qfile.read()
 			file_html = file_correction(cfile, file_html)
-			soup = BeautifulSoup(file_html, 'html.parser')
+			soup = parse_html(file_html, parser)
 
 			heading = soup.body.h1
 			if we_dont_care(heading):
@@ -399,8 +419,7 @@ def build_hubeali_book_8(dirname) -> List[Chapter]:
 					last_element = last_element.next_sibling
 					continue
 
-				is_tag = isinstance(last_element, Tag)
-				is_paragraph = is_tag and last_element.name == 'p'
+				is_paragraph = is_tag(last_element) and last_element.name == 'p'
 				is_not_section_break_paragraph = is_paragraph and not is_section_break_tag(last_element)
 				is_arabic = is_arabic_tag(last_element)
 
@@ -443,7 +462,7 @@ def build_hubeali_book_8(dirname) -> List[Chapter]:
 
 	return [book]
 
-def build_volume(file, title_en: str, title_ar: str, description: str, last_volume: bool = False) -> Chapter:
+def build_volume(file, title_en: str, title_ar: str, description: str, last_volume: bool = False, parser: str = config.DATA_HTML_PARSER) -> Chapter:
 	volume = Chapter()
 	volume.titles = {
 		Language.EN.value: title_en,
@@ -453,9 +472,9 @@ def build_volume(file, title_en: str, title_ar: str, description: str, last_volu
 			Language.EN.value: description
 	}
 	if last_volume:
-		volume.chapters = build_hubeali_book_8(file)
+		volume.chapters = build_hubeali_book_8(file, parser)
 	else:
-		volume.chapters = build_hubeali_books(file)
+		volume.chapters = build_hubeali_books(file, parser)
 	volume.part_type = PartType.Volume
 
 	return volume
@@ -464,7 +483,60 @@ def get_path(file):
 	return os.path.join(os.path.dirname(__file__), "raw\\" + file)
 
 
-def build_kafi() -> Chapter:
+VOLUMES = [
+	(get_path("hubeali_com\\Al-Kafi-Volume-1\\"), "Volume One", "الجزء الأول‏", "First volume of Al-Kafi", False),
+	(get_path("hubeali_com\\Al-Kafi-Volume-2\\"), "Volume Two", "الجزء الثاني‏", "Second volume of Al-Kafi", False),
+	(get_path("hubeali_com\\Al-Kafi-Volume-3\\"), "Volume Three", "الجزء الثالث‏", "Third volume of Al-Kafi", False),
+	(get_path("hubeali_com\\Al-Kafi-Volume-4\\"), "Volume Four", "الجزء الرابع‏", "Forth volume of Al-Kafi", False),
+	(get_path("hubeali_com\\Al-Kafi-Volume-5\\"), "Volume Five", "الجزء الخامس‏", "Fifth volume of Al-Kafi", False),
+	(get_path("hubeali_com\\Al-Kafi-Volume-6\\"), "Volume Six", "الجزء السادس‏", "Sixth volume of Al-Kafi", False),
+	(get_path("hubeali_com\\Al-Kafi-Volume-7\\"), "Volume Seven", "الجزء السابع‏", "Seventh volume of Al-Kafi", False),
+	(get_path("hubeali_com\\Al-Kafi-Volume-8\\"), "Volume Eight", "الجزء الثامن‏", "Eighth volume of Al-Kafi", True),
+]
+
+def build_volume_counted(*volume):
+	"""
+	`build_volume` for a worker process, returning the corrections it matched as well.
+	"""
+	CORRECTION_COUNTS.clear()
+	chapter = build_volume(*volume)
+	return chapter, dict(CORRECTION_COUNTS)
+
+def volume_sources(dirname) -> Dict[str, str]:
+	return source_digests(
+		glob.glob(dirname + "c*.xhtml"),
+		lambda cfile: CORRECTIONS.get(os.path.basename(cfile))
+	)
+
+def build_volumes(volumes, workers: int = 1, parser: str = config.DATA_HTML_PARSER) -> List[Chapter]:
+	"""
+	`build_volume` for each of `volumes`, in order. Volumes whose files, corrections
+	and parser are unchanged since the last run come from the cache. With more than
+	one worker the others are parsed in separate processes; they only meet again in
+	`set_index`.
+	"""
+	version = digest(code_version(__file__, lib_lxml.__file__, *MODEL_FILES), code_digest(*CORRECTION_ENGINE), parser)
+	names = [BOOK_INDEX + " " + volume[1] for volume in volumes]
+	sources = [volume_sources(volume[0]) for volume in volumes]
+	built = [load_cached(name, source, version) for name, source in zip(names, sources)]
+
+	missing = [i for i, volume in enumerate(built) if volume is None]
+	arguments = [volumes[i] + (parser,) for i in missing]
+	if workers > 1 and len(missing) > 1:
+		with ProcessPoolExecutor(max_workers=workers) as executor:
+			parsed = []
+			for volume, counts in executor.map(build_volume_counted, *zip(*arguments)):
+				CORRECTION_COUNTS.update(counts)
+				parsed.append(volume)
+	else:
+		parsed = [build_volume(*argument) for argument in arguments]
+
+	for i, volume in zip(missing, parsed):
+		store_cached(names[i], sources[i], version, volume)
+		built[i] = volume
+	return built
+
+def build_kafi(workers: int = config.DATA_PARSE_WORKERS) -> Chapter:
 	kafi = Chapter()
 	kafi.index = BOOK_INDEX
 	kafi.path = BOOK_PATH
@@ -475,55 +547,7 @@ def build_kafi() -> Chapter:
 	kafi.descriptions = {
 			Language.EN.value: "Of the majestic narrator and the scholar, the jurist, the Sheykh Muhammad Bin Yaqoub Al-Kulayni Well known as ‘The trustworthy of Al-Islam Al-Kulayni’ Who died in the year 329 H"
 	}
-	kafi.chapters = []
-
-	kafi.chapters.append(build_volume(
-		get_path("hubeali_com\\Al-Kafi-Volume-1\\"),
-		"Volume One",
-		"الجزء الأول‏",
-		"First volume of Al-Kafi"))
-
-	kafi.chapters.append(build_volume(
-		get_path("hubeali_com\\Al-Kafi-Volume-2\\"),
-		"Volume Two",
-		"الجزء الثاني‏",
-		"Second volume of Al-Kafi"))
-
-	kafi.chapters.append(build_volume(
-		get_path("hubeali_com\\Al-Kafi-Volume-3\\"),
-		"Volume Three",
-		"الجزء الثالث‏",
-		"Third volume of Al-Kafi"))
-
-	kafi.chapters.append(build_volume(
-		get_path("hubeali_com\\Al-Kafi-Volume-4\\"),
-		"Volume Four",
-		"الجزء الرابع‏",
-		"Forth volume of Al-Kafi"))
-
-	kafi.chapters.append(build_volume(
-		get_path("hubeali_com\\Al-Kafi-Volume-5\\"),
-		"Volume Five",
-		"الجزء الخامس‏",
-		"Fifth volume of Al-Kafi"))
-
-	kafi.chapters.append(build_volume(
-		get_path("hubeali_com\\Al-Kafi-Volume-6\\"),
-		"Volume Six",
-		"الجزء السادس‏",
-		"Sixth volume of Al-Kafi"))
-
-	kafi.chapters.append(build_volume(
-		get_path("hubeali_com\\Al-Kafi-Volume-7\\"),
-		"Volume Seven",
-		"الجزء السابع‏",
-		"Seventh volume of Al-Kafi"))
-
-	kafi.chapters.append(build_volume(
-		get_path("hubeali_com\\Al-Kafi-Volume-8\\"),
-		"Volume Eight",
-		"الجزء الثامن‏",
-		"Eighth volume of Al-Kafi", True))
+	kafi.chapters = build_volumes(VOLUMES, workers)
 
 	# kafi.chapters.append(build_volume(
 	# 	get_path("alhassanain_org\\hubeali_com_usul_kafi_v_01_ed_html\\usul_kafi_v_01_ed.htm"),
@@ -561,9 +585,12 @@ def build_kafi() -> Chapter:
 def init_kafi(db_session: Session):
 	book = build_kafi()
 
-	with open(get_path('kafi.json'), 'w', encoding='utf-8') as f:
-		json.dump(jsonable_encoder(book), f, ensure_ascii=False, indent=2, sort_keys=True)
+	if config.DATA_DUMP_NDJSON:
+		dump_ndjson(chapter_parts(book), get_path('kafi.ndjson'))
+	else:
+		dump_json(book, get_path('kafi.json'))
 
 	insert_chapter(db_session, book)
 
 	pprint(SEQUENCE_ERRORS)
+	pprint(unmatched_corrections())
@@ -1,4 +1,10 @@
+import logging
 import os
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
 
 CORRECTIONS = {
 	'c005.xhtml': [
@@ -211,12 +217,92 @@ CORRECTIONS = {
 	]
 }
 
+def overlaps(a: str, b: str) -> bool:
+	"""
+	Whether an occurrence of `a` and one of `b` can share characters.
+	"""
+	if not a or not b or a in b or b in a:
+		return True
+	for length in range(1, min(len(a), len(b))):
+		if a.endswith(b[:length]) or b.endswith(a[:length]):
+			return True
+	return False
+
+def depends_on_order(corrections: List[dict]) -> bool:
+	"""
+	Whether a correction can match text that an earlier one produced or overlaps,
+	in which case a single scan would not give the same result as replacing in turn.
+	"""
+	for i, earlier in enumerate(corrections):
+		for later in corrections[i + 1:]:
+			if overlaps(earlier['before'], later['before']) or overlaps(earlier['after'], later['before']):
+				return True
+	return False
+
+class Corrector:
+	def __init__(self, corrections: List[dict]):
+		"""
+		The corrections of one file compiled into a single alternation, so the file
+		is scanned once however many corrections it has. Corrections that depend on
+		each other's output are still applied one after the other.
+		"""
+		self.corrections = corrections
+		self.sequential = len(corrections) > 1 and depends_on_order(corrections)
+		self.pattern = re.compile("|".join("(" + re.escape(correction['before']) + ")" for correction in corrections))
+
+	def apply(self, content: str) -> Tuple[str, List[int]]:
+		"""
+		`content` corrected, along with the number of matches of each correction.
+		"""
+		if self.sequential:
+			counts = []
+			for correction in self.corrections:
+				counts.append(content.count(correction['before']))
+				content = content.replace(correction['before'], correction['after'])
+			return content, counts
+
+		counts = [0] * len(self.corrections)
+
+		def replace(match):
+			rule = match.lastindex - 1
+			counts[rule] += 1
+			return self.corrections[rule]['after']
+
+		return self.pattern.sub(replace, content), counts
+
+CORRECTORS: Dict[str, Corrector] = {}
+
+# matches per (file name, correction number), summed over the files seen by this process
+CORRECTION_COUNTS = Counter()
+
 def file_correction(filepath: str, content: str) -> str:
 	filename = os.path.basename(filepath)
 	
 	if filename in CORRECTIONS:
-		corrections = CORRECTIONS[filename]
-		for correction in corrections:
-			content = content.replace(correction['before'], correction['after'])
+		if filename not in CORRECTORS:
+			CORRECTORS[filename] = Corrector(CORRECTIONS[filename])
+		content, counts = CORRECTORS[filename].apply(content)
+
+		for number, (correction, count) in enumerate(zip(CORRECTIONS[filename], counts)):
+			CORRECTION_COUNTS[(filename, number)] += count
+			expected = correction.get('count', 1)
+			if count > expected:
+				logger.warning("Correction %i of %s matched %i times in %s, expected %i", number, filename, count, filepath, expected)
 
 	return content
+
+# the code applying CORRECTIONS: parse caches are versioned by it, while each
+# file's own corrections are part of that file's source hash
+CORRECTION_ENGINE = (overlaps, depends_on_order, Corrector, file_correction)
+
+def unmatched_corrections() -> List[str]:
+	"""
+	Corrections that did not match in any of the files they were applied to.
+
+	File names repeat across volumes, so a correction only has to match in one of them.
+	"""
+	return [
+		filename + " correction " + str(number) + ": " + CORRECTIONS[filename][number]['before'][:80]
+		for (filename, number), count in sorted(CORRECTION_COUNTS.items())
+		if count == 0
+	]
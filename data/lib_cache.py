@@ -0,0 +1,159 @@
+"""
+Lets re-ingestion skip the work whose inputs did not change.
+
+Parsed sources are pickled under a key hashed from the raw files, the
+corrections applied to them and the parser code. The per file hashes are kept
+in a manifest so a rebuild can tell which files changed. Book parts carry
+their own content hash in the database, which `upsert_batch` compares before
+writing.
+"""
+import glob
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+from typing import Callable, Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "raw", "cache")
+MANIFEST_FILE = "manifest.json"
+
+# the classes parsed sources are pickled as, part of each parser's `code_version`
+MODEL_FILES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "models", "*.py")))
+
+SUMMARY = {
+	"parsed": [],
+	"reused": [],
+	"changed_files": [],
+	"parts_loaded": 0,
+	"parts_written": 0,
+}
+
+
+def digest(*values) -> str:
+	sha = hashlib.sha256()
+	for value in values:
+		if isinstance(value, str):
+			value = value.encode('utf8')
+		elif not isinstance(value, bytes):
+			value = json.dumps(value, sort_keys=True).encode('utf8')
+		sha.update(value)
+		sha.update(b'\0')
+	return sha.hexdigest()
+
+
+def file_digest(path: str, *extra) -> str:
+	with open(path, 'rb') as f:
+		return digest(f.read(), *extra)
+
+
+def code_version(*paths) -> str:
+	"""
+	Hash of the source files at `paths`, so editing a parser invalidates what it built.
+	"""
+	return digest(*[file_digest(path) for path in paths])
+
+
+def code_digest(*objects) -> str:
+	"""
+	Hash of the source of the functions and classes `objects`, for code that
+	shares its module with data that is versioned separately.
+	"""
+	return digest(*[inspect.getsource(obj) for obj in objects])
+
+
+def source_digests(files: Iterable[str], extra: Callable[[str], object] = None, root: str = None) -> Dict[str, str]:
+	"""
+	Hash of each of `files`, along with `extra(file)` such as the corrections applied
+	to it. Files are named relative to `root`, or by their base name.
+	"""
+	return {
+		os.path.relpath(file, root) if root else os.path.basename(file): file_digest(file, extra(file) if extra else None)
+		for file in sorted(files)
+	}
+
+
+def load_manifest(directory: str = CACHE_DIR) -> dict:
+	try:
+		with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf8') as f:
+			return json.load(f)
+	except FileNotFoundError:
+		return {}
+
+
+def save_manifest(manifest: dict, directory: str = CACHE_DIR):
+	os.makedirs(directory, exist_ok=True)
+	path = os.path.join(directory, MANIFEST_FILE)
+	with open(path + '.tmp', 'w', encoding='utf8') as f:
+		json.dump(manifest, f, indent=2, sort_keys=True)
+	os.replace(path + '.tmp', path)
+
+
+def cached_path(name: str, key: str, directory: str = CACHE_DIR) -> str:
+	return os.path.join(directory, digest(name) + '-' + key + '.pickle')
+
+
+def load_cached(name: str, sources: Dict[str, str], version: str, directory: str = CACHE_DIR):
+	"""
+	What was built from exactly `sources` with parser `version`, `None` if it has to be rebuilt.
+	"""
+	key = digest(version, sources)
+	path = cached_path(name, key, directory)
+	if os.path.exists(path):
+		try:
+			with open(path, 'rb') as f:
+				value = pickle.load(f)
+		except Exception as e:
+			# e.g. pickled with model classes that have since changed
+			logger.warning("Could not load cached %s, reparsing: %r", name, e)
+			return None
+		SUMMARY["reused"].append(name)
+		logger.info("Reusing parsed %s", name)
+		return value
+
+	previous = load_manifest(directory).get(name, {})
+	changed = sorted(
+		file for file, file_hash in sources.items()
+		if previous.get("files", {}).get(file) != file_hash
+	)
+	if previous.get("version") not in (None, version):
+		logger.info("Parser changed, reparsing %s", name)
+	elif previous:
+		logger.info("Reparsing %s, changed files: %s", name, ", ".join(changed) or "(removed files only)")
+		SUMMARY["changed_files"].extend(name + ":" + file for file in changed)
+	return None
+
+
+def store_cached(name: str, sources: Dict[str, str], version: str, value, directory: str = CACHE_DIR):
+	os.makedirs(directory, exist_ok=True)
+	key = digest(version, sources)
+	manifest = load_manifest(directory)
+	stale = manifest.get(name, {}).get("key")
+	if stale and stale != key and os.path.exists(cached_path(name, stale, directory)):
+		os.remove(cached_path(name, stale, directory))
+
+	path = cached_path(name, key, directory)
+	with open(path + '.tmp', 'wb') as f:
+		pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+	os.replace(path + '.tmp', path)
+
+	manifest[name] = {"key": key, "version": version, "files": sources}
+	save_manifest(manifest, directory)
+	SUMMARY["parsed"].append(name)
+
+
+def record_parts(loaded: int, written: int):
+	SUMMARY["parts_loaded"] += loaded
+	SUMMARY["parts_written"] += written
+
+
+def log_summary():
+	logger.info("Parsed %i sources: %s", len(SUMMARY["parsed"]), ", ".join(SUMMARY["parsed"]) or "-")
+	logger.info("Reused %i parsed sources: %s", len(SUMMARY["reused"]), ", ".join(SUMMARY["reused"]) or "-")
+	logger.info("Changed source files: %s", ", ".join(SUMMARY["changed_files"]) or "-")
+	if SUMMARY["parts_loaded"]:
+		logger.info("Book parts: %i written, %i unchanged",
+			SUMMARY["parts_written"], SUMMARY["parts_loaded"] - SUMMARY["parts_written"])
@@ -1,10 +1,17 @@
+import difflib
+import json
 import logging
+import time
+from typing import Dict, Iterable, Iterator, List
 
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
 from app import crud
+from app.core.encoders import content_hash
 from app.schemas.book_part import BookPartCreate
+from data.lib_cache import record_parts
+from data.lib_encoder import chapter_list, encode
 from data.lib_model import has_chapters, has_verses
 from data.models import Chapter, Language, Quran, Translation, Verse
 
@@ -15,36 +22,100 @@ def index_from_path(path: str) -> str:
 	return path[7:]
 
 def insert_chapter(db: Session, book: Chapter):
+	load_book_parts(db, chapter_parts(book))
+
+def load_book_parts(db: Session, parts: Iterable[BookPartCreate], batch_size: int = 1000) -> int:
+	"""
+	Write `parts` as they are produced, one transaction per `batch_size` rows, logging the progress.
+	"""
+	start = time.time()
+	loaded = written = 0
+	for batch in batches(parts, batch_size):
+		batch_start = time.time()
+		written += len(crud.book_part.upsert_batch(db, objs_in=batch))
+		loaded += len(batch)
+		logger.info("Loaded %i book parts (%i written) up to %s, %.0f rows/sec", loaded, written, batch[-1].index, len(batch) / max(time.time() - batch_start, 1e-6))
+	elapsed = time.time() - start
+	logger.info("Loaded %i book parts (%i written) in %.1fs, %.0f rows/sec", loaded, written, elapsed, loaded / max(elapsed, 1e-6))
+	record_parts(loaded, written)
+	return written
+
+def diff_book_parts(db: Session, parts: Iterable[BookPartCreate], index: str, batch_size: int = 1000, show_diff: bool = False) -> Dict[str, List[str]]:
+	"""
+	Compare `parts` with the stored parts under `index` by content hash, without
+	writing. Stored hashes are fetched a batch at a time, stored data only for the
+	changed parts when `show_diff` is set. A part is unchanged exactly when
+	`upsert_batch` would skip it, so stored parts without a payload count as changed.
+	"""
+	report = {"added": [], "changed": [], "removed": []}
+	generated = set()
+	unchanged = 0
+	for batch in batches(parts, batch_size):
+		rows = {}
+		for part in batch:
+			row = jsonable_encoder(part)
+			rows[row['index']] = row
+		generated.update(rows)
+
+		stored = crud.book_part.get_hashes_by_index(db, indexes=list(rows), rendered=True)
+		changed = []
+		for part_index, row in rows.items():
+			if part_index not in stored:
+				report["added"].append(part_index)
+			elif stored[part_index] != content_hash(row):
+				changed.append(part_index)
+			else:
+				unchanged += 1
+		report["changed"].extend(changed)
+
+		if show_diff and changed:
+			stored_data = crud.book_part.get_data_by_index(db, indexes=changed)
+			for part_index in changed:
+				log_diff(part_index, stored_data.get(part_index), rows[part_index]['data'])
+
+	report["removed"] = sorted(set(crud.book_part.get_indexes_under(db, index=index)) - generated)
+	logger.info("%s: %i added, %i changed, %i removed, %i unchanged", index,
+		len(report["added"]), len(report["changed"]), len(report["removed"]), unchanged)
+	return report
+
+def log_diff(index: str, stored, generated):
+	def lines(data):
+		return json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True).splitlines()
+
+	diff = difflib.unified_diff(lines(stored), lines(generated), index + " (stored)", index + " (generated)", lineterm="")
+	logger.info("\n".join(diff))
+
+def batches(items: Iterable, size: int) -> Iterator[list]:
+	batch = []
+	for item in items:
+		batch.append(item)
+		if len(batch) >= size:
+			yield batch
+			batch = []
+	if batch:
+		yield batch
+
+def chapter_parts(book: Chapter) -> Iterator[BookPartCreate]:
 	if has_chapters(book):
-		insert_chapters_list(db, book)
+		yield chapter_list_part(book)
+		for chapter in book.chapters:
+			yield from chapter_parts(chapter)
 
 	if has_verses(book):
-		insert_chapter_content(db, book)
+		yield chapter_content_part(book)
 
-def insert_chapters_list(db: Session, book: Chapter):
-	book_data = jsonable_encoder(book)
-	for chapter in book_data['chapters']:
-		chapter.pop('chapters', None)
-		chapter.pop('verses', None)
-
-	obj_in = BookPartCreate (
+def chapter_list_part(book: Chapter) -> BookPartCreate:
+	return BookPartCreate (
 		index = index_from_path(book.path),
 		kind = "chapter_list",
-		data = book_data,
+		data = chapter_list(book),
 		last_updated_id = 1
 	)
-	book_part = crud.book_part.upsert(db, obj_in=obj_in)
-	logger.info("Inserted chapter list into book_part ID %i with index %s", book_part.id, book_part.index)
-
-	for chapter in book.chapters:
-		insert_chapter(db, chapter)
 
-def insert_chapter_content(db: Session, chapter: Chapter):
-	obj_in = BookPartCreate (
+def chapter_content_part(chapter: Chapter) -> BookPartCreate:
+	return BookPartCreate (
 		index = index_from_path(chapter.path),
 		kind = "verse_list",
-		data = chapter,
+		data = encode(chapter),
 		last_updated_id = 1
 	)
-	book = crud.book_part.upsert(db, obj_in=obj_in)
-	logger.info("Inserted chapter content into book_part ID %i with index %s", book.id, book.index)
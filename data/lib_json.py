@@ -0,0 +1,96 @@
+"""
+Writes book trees as JSON while walking them, instead of encoding the whole
+tree with `jsonable_encoder` first, so memory use does not grow with the book.
+"""
+import json
+from enum import Enum
+from types import GeneratorType
+from typing import Iterable, Iterator, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+# chunks are gathered up to this size before each write
+WRITE_BUFFER = 1 << 16
+
+
+def iter_json(value, indent: Optional[int] = None, level: int = 0) -> Iterator[str]:
+	"""
+	Chunks of the same text as `json.dumps(jsonable_encoder(value), ensure_ascii=False,
+	indent=indent, sort_keys=True)`, or with compact separators when `indent` is `None`.
+	"""
+	if value is None or isinstance(value, (str, int, float)):
+		yield json.dumps(value, ensure_ascii=False)
+		return
+	if isinstance(value, Enum):
+		yield from iter_json(value.value, indent, level)
+		return
+
+	if isinstance(value, dict):
+		items = value.items()
+	elif isinstance(value, (list, set, frozenset, GeneratorType, tuple)):
+		items = None
+	else:
+		try:
+			items = dict(value).items()
+		except Exception:
+			yield json.dumps(jsonable_encoder(value), ensure_ascii=False, sort_keys=True)
+			return
+
+	if items is not None:
+		entries = sorted(items, key=lambda item: item[0])
+		open_bracket, close_bracket = '{', '}'
+	else:
+		entries = value
+		open_bracket, close_bracket = '[', ']'
+
+	if indent is None:
+		newline = inner_newline = ''
+		key_separator = ':'
+	else:
+		newline = '\n' + ' ' * (indent * level)
+		inner_newline = '\n' + ' ' * (indent * (level + 1))
+		key_separator = ': '
+
+	first = True
+	for entry in entries:
+		yield (open_bracket if first else ',') + inner_newline
+		first = False
+		if items is not None:
+			key, entry = entry
+			yield json.dumps(str(key), ensure_ascii=False) + key_separator
+		yield from iter_json(entry, indent, level + 1)
+	yield (open_bracket + close_bracket) if first else (newline + close_bracket)
+
+
+def write_chunks(f, chunks: Iterable[str]):
+	buffer = []
+	size = 0
+	for chunk in chunks:
+		buffer.append(chunk)
+		size += len(chunk)
+		if size >= WRITE_BUFFER:
+			f.write(''.join(buffer))
+			buffer = []
+			size = 0
+	f.write(''.join(buffer))
+
+
+def dump_json(value, path: str, indent: Optional[int] = 2):
+	"""
+	Write `value` to `path` as one JSON document, keys sorted.
+	"""
+	with open(path, 'w', encoding='utf-8') as f:
+		write_chunks(f, iter_json(value, indent))
+
+
+def dump_ndjson(parts: Iterable, path: str) -> int:
+	"""
+	Write each of `parts`, such as the book parts of `chapter_parts`, as one line of JSON.
+	"""
+	count = 0
+	with open(path, 'w', encoding='utf-8') as f:
+		for part in parts:
+			write_chunks(f, iter_json(part))
+			f.write('\n')
+			count += 1
+	return count
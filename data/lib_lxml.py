@@ -0,0 +1,263 @@
+"""
+lxml backed stand-ins for the parts of BeautifulSoup the hubeali parsers use.
+
+The xhtml files are parsed by libxml2 instead of Python's html.parser, and
+nodes are only wrapped when the parsers walk over them. Strings and
+serialisation follow what BeautifulSoup with 'html.parser' produces, so both
+backends build the same Chapter/Verse tree.
+"""
+import logging
+from typing import Iterator, List, Optional, Union
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# elements BeautifulSoup's html.parser builder writes as <br/> when empty
+VOID_ELEMENTS = {
+	'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr',
+	'img', 'input', 'keygen', 'link', 'menuitem', 'meta', 'param', 'source', 'spacer',
+	'track', 'wbr',
+}
+
+XML_NAMESPACE = "http://www.w3.org/XML/1998/namespace"
+
+# html.parser reads numeric references below 256 as windows-1252, e.g. &#150; is an en dash
+CP1252_CONTROLS = {}
+for code in range(0x80, 0xa0):
+	try:
+		CP1252_CONTROLS[code] = bytes([code]).decode('cp1252')
+	except UnicodeDecodeError:
+		pass
+
+# elements in which html.parser keeps whitespace only strings as they are
+PRESERVE_WHITESPACE = {'pre', 'textarea'}
+ASCII_SPACES = ' \n\t\x0c\r'
+
+PARSER = etree.XMLParser(resolve_entities=False, huge_tree=True)
+
+
+def html_text(text: str) -> str:
+	return text.translate(CP1252_CONTROLS)
+
+
+def html_string(text: str, parent) -> str:
+	"""
+	`text` as html.parser gives it: whitespace only strings become a single newline or space.
+	"""
+	if text.strip(ASCII_SPACES):
+		return html_text(text)
+	element = parent
+	while element is not None:
+		if local_name(element.tag) in PRESERVE_WHITESPACE:
+			return text
+		element = element.getparent()
+	return '\n' if '\n' in text else ' '
+
+
+def local_name(tag: str) -> str:
+	return tag.rsplit('}', 1)[-1]
+
+
+def qualified_name(key: str, nsmap: dict) -> str:
+	if not key.startswith('{'):
+		return key
+	uri, name = key[1:].split('}', 1)
+	if uri == XML_NAMESPACE:
+		return 'xml:' + name
+	for prefix, namespace in nsmap.items():
+		if namespace == uri and prefix:
+			return prefix + ':' + name
+	return name
+
+
+def escape_text(text: str) -> str:
+	return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def quote_attribute(value: str) -> str:
+	value = escape_text(value)
+	if '"' in value:
+		if "'" in value:
+			return '"' + value.replace('"', '&quot;') + '"'
+		return "'" + value + "'"
+	return '"' + value + '"'
+
+
+def wrap(node) -> Union['LxmlTag', 'LxmlString', None]:
+	if node is None:
+		return None
+	if isinstance(node.tag, str):
+		return LxmlTag(node)
+	if node.tag is etree.Comment:
+		return LxmlComment(html_text(node.text or ''), following=node)
+	if node.tag is etree.PI:
+		return LxmlProcessingInstruction(processing_instruction(node), following=node)
+	raise TypeError("Unexpected node " + repr(node))
+
+
+def processing_instruction(node) -> str:
+	# html.parser keeps everything between '<?' and '>'
+	return node.target + (' ' + node.text if node.text else '') + '?'
+
+
+def following_sibling(node):
+	"""
+	What bs4 calls `next_sibling`: the text after `node`, else the next node.
+	"""
+	if node.tail:
+		return LxmlString(html_string(node.tail, node.getparent()), following=node)
+	return wrap(node.getnext())
+
+
+class LxmlString(str):
+	"""
+	Text between elements, standing in for bs4's NavigableString.
+	"""
+	def __new__(cls, value: str, following=None):
+		string = super().__new__(cls, value)
+		string._following = following
+		return string
+
+	@property
+	def next_sibling(self):
+		if self._following is None:
+			return None
+		return wrap(self._following.getnext())
+
+	def get_text(self, strip: bool = False) -> str:
+		return self.strip() if strip else str(self)
+
+	def decode(self) -> str:
+		return escape_text(self)
+
+
+class LxmlComment(LxmlString):
+	@property
+	def next_sibling(self):
+		return following_sibling(self._following)
+
+	def decode(self) -> str:
+		return '<!--' + self + '-->'
+
+
+class LxmlProcessingInstruction(LxmlComment):
+	def decode(self) -> str:
+		return '<?' + self + '>'
+
+
+class LxmlTag:
+	"""
+	An element, standing in for bs4's Tag.
+	"""
+	def __init__(self, element):
+		self.element = element
+		self.name = local_name(element.tag)
+		self._attrs = None
+
+	@property
+	def attrs(self) -> dict:
+		if self._attrs is None:
+			nsmap = self.element.nsmap
+			parent = self.element.getparent()
+			inherited = parent.nsmap if parent is not None else {}
+			attrs = {}
+			for prefix, uri in nsmap.items():
+				if inherited.get(prefix) != uri:
+					attrs['xmlns:' + prefix if prefix else 'xmlns'] = uri
+			for key, value in self.element.attrib.items():
+				name = qualified_name(key, nsmap)
+				value = html_text(value)
+				attrs[name] = value.split() if name == 'class' else value
+			self._attrs = attrs
+		return self._attrs
+
+	@property
+	def contents(self) -> List[Union['LxmlTag', LxmlString]]:
+		nodes = []
+		if self.element.text:
+			nodes.append(LxmlString(html_string(self.element.text, self.element)))
+		for child in self.element:
+			if isinstance(child.tag, str):
+				nodes.append(LxmlTag(child))
+			elif child.tag is etree.Comment:
+				nodes.append(LxmlComment(html_text(child.text or ''), following=child))
+			else:
+				nodes.append(wrap(child))
+			if child.tail:
+				nodes.append(LxmlString(html_string(child.tail, self.element), following=child))
+		return nodes
+
+	@property
+	def next_sibling(self):
+		return following_sibling(self.element)
+
+	def has_attr(self, key: str) -> bool:
+		return key in self.attrs
+
+	def __getitem__(self, key: str):
+		return self.attrs[key]
+
+	def strings(self) -> Iterator[str]:
+		if self.element.text:
+			yield html_string(self.element.text, self.element)
+		for child in self.element:
+			if isinstance(child.tag, str):
+				yield from LxmlTag(child).strings()
+			if child.tail:
+				yield html_string(child.tail, self.element)
+
+	def get_text(self, strip: bool = False) -> str:
+		if strip:
+			return ''.join(text.strip() for text in self.strings() if text.strip())
+		return ''.join(self.strings())
+
+	def find(self, name: str, class_: str = None) -> Optional['LxmlTag']:
+		for element in self.element.iterdescendants('{*}' + name):
+			if class_ is None:
+				return LxmlTag(element)
+			classes = element.get('class', '').split()
+			if class_ in classes or ' '.join(classes) == class_:
+				return LxmlTag(element)
+		return None
+
+	def __getattr__(self, name: str):
+		# tag.h1 is the first h1 below tag, as in bs4
+		if name.startswith('_'):
+			raise AttributeError(name)
+		return self.find(name)
+
+	def decode(self) -> str:
+		attrs = ''
+		# bs4 writes attributes sorted by name
+		for key, value in sorted(self.attrs.items()):
+			if isinstance(value, list):
+				value = ' '.join(value)
+			attrs += ' ' + key + '=' + quote_attribute(value)
+		contents = self.contents
+		if not contents and self.name in VOID_ELEMENTS:
+			return '<' + self.name + attrs + '/>'
+		inner = ''.join(node.decode() for node in contents)
+		return '<' + self.name + attrs + '>' + inner + '</' + self.name + '>'
+
+	def __str__(self) -> str:
+		return self.decode()
+
+
+def parse_xhtml(file_html: str) -> Optional[LxmlTag]:
+	"""
+	Root of `file_html` parsed as XML, `None` if it is not well formed or uses
+	entity references.
+
+	Entities declared by the DOCTYPE, like &nbsp;, are left unresolved as their own
+	nodes, where html.parser merges their text into the surrounding string.
+	"""
+	try:
+		root = etree.fromstring(file_html.encode('utf8'), PARSER)
+	except etree.XMLSyntaxError as e:
+		logger.warning("Could not parse as xhtml, %s", e)
+		return None
+	if next(root.iter(etree.Entity), None) is not None:
+		logger.info("Entity references in xhtml, parsing with html.parser")
+		return None
+	return LxmlTag(root)
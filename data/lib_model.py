@@ -1,9 +1,8 @@
-import copy
 import re
 from typing import Dict, List
 
-from data.models import (Chapter, Crumb, Language, PartType, Quran,
-                         Translation, Verse)
+from data.models import (Chapter, Crumb, CrumbTrail, Language, PartType,
+                         Quran, Translation, Verse)
 
 CHAPTER_TITLE_PATTERN = re.compile("Chapter (\d+)")
 
@@ -15,7 +14,28 @@ def has_chapters(book: Chapter) -> bool:
 def has_verses(book: Chapter) -> bool:
 	return hasattr(book, 'verses') and book.verses is not None
 
-def set_index(chapter: Chapter, indexes: List[int], depth: int) -> List[int]:
+class Level():
+	"""
+	A chapter whose subchapters `set_index` is numbering.
+	"""
+	__slots__ = ('chapter', 'depth', 'trail', 'subchapters', 'sequence')
+
+	def __init__(self, chapter: Chapter, depth: int, trail: CrumbTrail):
+		self.chapter = chapter
+		self.depth = depth
+		self.trail = trail
+		self.subchapters = enumerate(chapter.chapters if has_chapters(chapter) else [], 1)
+		self.sequence = None
+
+def crumb_trail(crumbs) -> CrumbTrail:
+	if crumbs is None or isinstance(crumbs, CrumbTrail):
+		return crumbs
+	trail = None
+	for crumb in crumbs:
+		trail = CrumbTrail(crumb, trail)
+	return trail
+
+def index_verses(chapter: Chapter, indexes: List[int], depth: int):
 	if len(indexes) < depth + 1:
 		indexes.append(0)
 
@@ -29,44 +49,55 @@ def set_index(chapter: Chapter, indexes: List[int], depth: int) -> List[int]:
 				verse.local_index = verse_local_index
 				verse.path = chapter.path + ":" + str(verse_local_index)
 		chapter.verse_count = indexes[depth] - chapter.verse_start_index
-	
-	report_numbering = True
-	sequence = None
-	if has_chapters(chapter):
-		chapter_local_index = 0
-		for subchapter in chapter.chapters:
-			indexes[depth] = indexes[depth] + 1
-			subchapter.index = indexes[depth]
-			chapter_local_index = chapter_local_index + 1
-			subchapter.local_index = chapter_local_index
-			subchapter.path = chapter.path + ":" + str(chapter_local_index)
-			subchapter.verse_start_index = indexes[-1]
-
-			if report_numbering and subchapter.part_type == PartType.Chapter:
-				chapter_number_str = CHAPTER_TITLE_PATTERN.search(subchapter.titles['en'])
-				if chapter_number_str:
-					chapter_number = int(chapter_number_str.group(1))
-					if sequence and sequence + 1 != chapter_number:
-						error_msg = 'Chapter ' + str(chapter_local_index) + ' with indexes ' + str(indexes) + ' does not match title ' + str(subchapter.titles)
-						print(error_msg)
-						SEQUENCE_ERRORS.append(error_msg)
-						# raise Exception('Chapter ' + str(chapter_local_index) + ' with indexes ' + str(indexes) + ' does not match title ' + str(subchapter.titles))
-					sequence = chapter_number
-					# if chapter_number != chapter_local_index:
-						# print('Chapter ' + str(chapter_local_index) + ' with indexes ' + str(indexes) + ' does not match title ' + str(subchapter.titles))
-						# report_numbering = False
-						# raise Exception('Chapter ' + str(chapter_local_index) + ' with indexes ' + str(indexes) + ' does not match title ' + str(subchapter.titles))
-
-			subchapter.crumbs = copy.copy(chapter.crumbs)
-			crumb = Crumb()
-			crumb.indexed_titles = {
-				Language.EN.value: subchapter.part_type.name + ' ' + str(subchapter.local_index)
-			}
-			crumb.titles = subchapter.titles
-			crumb.path = subchapter.path
-			subchapter.crumbs.append(crumb)
-
-			indexes = set_index(subchapter, indexes, depth + 1)
-		chapter.verse_count = indexes[-1] - chapter.verse_start_index
+
+def set_index(chapter: Chapter, indexes: List[int], depth: int) -> List[int]:
+	"""
+	Number the verses and subchapters below `chapter` depth first, without recursing.
+
+	Subchapter breadcrumbs are `CrumbTrail`s sharing their parent's trail; they
+	become lists again when a chapter is encoded.
+	"""
+	index_verses(chapter, indexes, depth)
+	levels = [Level(chapter, depth, crumb_trail(getattr(chapter, 'crumbs', None)))]
+
+	while levels:
+		level = levels[-1]
+		parent = level.chapter
+		subchapter_entry = next(level.subchapters, None)
+		if subchapter_entry is None:
+			if has_chapters(parent):
+				parent.verse_count = indexes[-1] - parent.verse_start_index
+			levels.pop()
+			continue
+
+		chapter_local_index, subchapter = subchapter_entry
+		depth = level.depth
+		indexes[depth] = indexes[depth] + 1
+		subchapter.index = indexes[depth]
+		subchapter.local_index = chapter_local_index
+		subchapter.path = parent.path + ":" + str(chapter_local_index)
+		subchapter.verse_start_index = indexes[-1]
+
+		if subchapter.part_type == PartType.Chapter:
+			chapter_number_str = CHAPTER_TITLE_PATTERN.search(subchapter.titles['en'])
+			if chapter_number_str:
+				chapter_number = int(chapter_number_str.group(1))
+				if level.sequence and level.sequence + 1 != chapter_number:
+					error_msg = 'Chapter ' + str(chapter_local_index) + ' with indexes ' + str(indexes) + ' does not match title ' + str(subchapter.titles)
+					print(error_msg)
+					SEQUENCE_ERRORS.append(error_msg)
+					# raise Exception('Chapter ' + str(chapter_local_index) + ' with indexes ' + str(indexes) + ' does not match title ' + str(subchapter.titles))
+				level.sequence = chapter_number
+
+		crumb = Crumb()
+		crumb.indexed_titles = {
+			Language.EN.value: subchapter.part_type.name + ' ' + str(subchapter.local_index)
+		}
+		crumb.titles = subchapter.titles
+		crumb.path = subchapter.path
+		subchapter.crumbs = CrumbTrail(crumb, level.trail)
+
+		index_verses(subchapter, indexes, depth + 1)
+		levels.append(Level(subchapter, depth + 1, subchapter.crumbs))
 
 	return indexes
@@ -1,21 +1,82 @@
+import argparse
 import logging
 
 from app.db.session import db_session
-from data.books import init_books
-from data.kafi import init_kafi
-from data.quran import init_quran
+from data.books import BOOK_INDEX as BOOKS_INDEX
+from data.books import books_part, init_books
+from data.kafi import BOOK_INDEX as KAFI_INDEX
+from data.kafi import build_kafi, init_kafi
+from data.lib_cache import log_summary
+from data.lib_db import chapter_parts, diff_book_parts
+from data.quran import BOOK_INDEX as QURAN_INDEX
+from data.quran import build_quran, init_quran, quran_parts
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# generated book parts of each book, for --dry-run
+BOOK_PARTS = {
+    BOOKS_INDEX: lambda: [books_part()],
+    QURAN_INDEX: lambda: quran_parts(build_quran()),
+    KAFI_INDEX: lambda: chapter_parts(build_kafi()),
+}
+
 
 def init():
     init_books(db_session)
     # init_quran(db_session)
     # init_kafi(db_session)
+    log_summary()
+
+
+def dry_run(books, show_diff: bool = False) -> dict:
+    """
+    Build `books` and report the book parts that loading them would add, change
+    or remove, without writing anything.
+    """
+    reports = {}
+    for book in books:
+        reports[book] = diff_book_parts(
+            db_session, BOOK_PARTS[book](), book, show_diff=show_diff
+        )
+
+    for book, report in reports.items():
+        for change in ("added", "changed", "removed"):
+            if report[change]:
+                logger.info("%s %s: %s", book, change, ", ".join(report[change]))
+    log_summary()
+    return reports
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Load the books into the database")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="compare the generated book parts with the database instead of writing them",
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="like --dry-run, also logging a JSON diff of every changed book part",
+    )
+    parser.add_argument(
+        "books",
+        nargs="*",
+        help="books to compare in a dry run: "
+        + ", ".join(BOOK_PARTS)
+        + "; all of them by default",
+    )
+    args = parser.parse_args()
+    unknown = [book for book in args.books if book not in BOOK_PARTS]
+    if unknown:
+        parser.error("unknown books: " + ", ".join(unknown))
+
+    if args.dry_run or args.diff:
+        logger.info("Comparing generated data with the database")
+        dry_run(args.books or list(BOOK_PARTS), show_diff=args.diff)
+        return
+
     logger.info("Creating initial data")
     init()
     logger.info("Initial data created")
@@ -1,4 +1,4 @@
-from .crumb import Crumb
+from .crumb import Crumb, CrumbTrail
 from .enums import Language, PartType
 from .quran import Chapter, Quran, Verse
 from .translation import Translation
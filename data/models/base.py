@@ -0,0 +1,33 @@
+import sys
+from typing import Iterator, Tuple
+
+UNSET = object()
+
+
+class Model():
+	"""
+	Base for the ingestion tree. Subclasses list their fields in `__slots__`, so
+	instances carry no `__dict__`; iterating one yields the fields that were set,
+	which is what `jsonable_encoder` and `dict()` read.
+	"""
+	__slots__ = ()
+
+	def __iter__(self) -> Iterator[Tuple[str, object]]:
+		for name in self.__slots__:
+			value = getattr(self, name, UNSET)
+			if value is not UNSET:
+				yield name, value
+
+
+class InternedModel(Model):
+	"""
+	Interns the string values of the fields in `INTERNED`, which repeat across
+	thousands of instances.
+	"""
+	__slots__ = ()
+	INTERNED = ()
+
+	def __setattr__(self, name: str, value):
+		if name in self.INTERNED and isinstance(value, str):
+			value = sys.intern(value)
+		super().__setattr__(name, value)
@@ -1,9 +1,30 @@
-from typing import Dict, List
+from typing import Dict, List, NamedTuple, Optional
 
+from data.models.base import Model
 from data.models.enums import PartType
 
 
-class Crumb():
+class Crumb(Model):
+	__slots__ = ('titles', 'indexed_titles', 'path')
+
 	titles: Dict[str, str]
 	indexed_titles: Dict[str, str]
 	path: str
+
+
+class CrumbTrail(NamedTuple):
+	"""
+	A chapter's breadcrumbs as its own crumb linked to the trail of its parent,
+	which all the siblings share.
+	"""
+	crumb: Crumb
+	parent: Optional['CrumbTrail']
+
+	def crumbs(self) -> List[Crumb]:
+		crumbs = []
+		trail = self
+		while trail is not None:
+			crumbs.append(trail.crumb)
+			trail = trail.parent
+		crumbs.reverse()
+		return crumbs
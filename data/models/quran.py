@@ -1,13 +1,16 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Dict, List, Union
 
-from data.models.crumb import Crumb
+from data.models.base import Model
+from data.models.crumb import Crumb, CrumbTrail
 from data.models.enums import Language, PartType
 from data.models.translation import Translation
 
 
-class Verse():
+class Verse(Model):
+	__slots__ = ('index', 'local_index', 'path', 'text', 'chain_text', 'sajda_type', 'translations', 'part_type')
+
 	index: int
 	local_index: int
 	path: str
@@ -17,7 +20,12 @@ class Verse():
 	translations: List[Translation]
 	part_type: PartType
 
-class Chapter():
+class Chapter(Model):
+	__slots__ = (
+		'verses', 'chapters', 'index', 'local_index', 'path', 'verse_count', 'verse_start_index',
+		'titles', 'descriptions', 'reveal_type', 'order', 'rukus', 'sajda_type', 'crumbs', 'part_type',
+	)
+
 	verses: List[Verse]
 	chapters: List[Chapter]
 	index: int
@@ -30,9 +38,19 @@ class Chapter():
 	reveal_type: str
 	order: int
 	rukus: int
-	sajda_type: str = None
-	crumbs: List[Crumb]
+	# unset unless the chapter has a sajda, like the other fields
+	sajda_type: str
+	crumbs: Union[List[Crumb], CrumbTrail]
 	part_type: PartType
 
-class Quran():
+	def __iter__(self):
+		# breadcrumbs are only expanded into a list when the chapter is encoded
+		for name, value in super().__iter__():
+			if isinstance(value, CrumbTrail):
+				value = value.crumbs()
+			yield name, value
+
+class Quran(Model):
+	__slots__ = ('chapters',)
+
 	chapters: List[Chapter]
@@ -1,4 +1,10 @@
-class Translation():
+from data.models.base import InternedModel
+
+
+class Translation(InternedModel):
+	__slots__ = ('name', 'text', 'lang')
+	INTERNED = ('name', 'lang')
+
 	name: str
 	text: str
 	lang: str
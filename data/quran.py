@@ -4,11 +4,10 @@ import os
 import sqlite3
 import xml.etree.ElementTree
 from sqlite3 import Error
-from typing import Dict, List
+from typing import Dict, Iterator, List
 
 from sqlalchemy.orm import Session
 
-from app import crud
 from app.core import config
 # make sure all SQL Alchemy models are imported before initializing DB
 # otherwise, SQL Alchemy might fail to initialize relationships properly
@@ -17,7 +16,10 @@ from app.db import base
 from app.db.base import Base
 from app.db.session import engine
 from app.schemas.book_part import BookPartCreate
-from data.lib_db import index_from_path, insert_chapter
+from data.lib_cache import (MODEL_FILES, code_version, load_cached,
+                            source_digests, store_cached)
+from data.lib_db import (chapter_parts, index_from_path, insert_chapter,
+                         load_book_parts)
 from data.lib_model import set_index
 from data.models import (Chapter, Crumb, Language, PartType, Quran,
                          Translation, Verse)
@@ -140,7 +142,12 @@ def get_path(file):
 	return os.path.join(os.path.dirname(__file__), "raw\\" + file)
 
 
-def build_quran() -> Chapter:
+def quran_sources() -> Dict[str, str]:
+	root = get_path("tanzil_net")
+	files = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(root) for name in names]
+	return source_digests(files, root=root)
+
+def build_quran_chapters() -> List[Chapter]:
 	verses = build_verses(get_path("tanzil_net/quran_simple.txt"))
 
 	insert_quran_translation(verses, get_path("tanzil_net/translations/fa.ansarian.txt"), "ansarian", "fa", "Hussain Ansarian", "https://fa.wikipedia.org/wiki/%D8%AD%D8%B3%DB%8C%D9%86_%D8%A7%D9%86%D8%B5%D8%A7%D8%B1%DB%8C%D8%A7%D9%86")
@@ -173,7 +180,15 @@ def build_quran() -> Chapter:
 	insert_quran_translation(verses, get_path("tanzil_net/translations/en.wahiduddin.txt"), "wahiduddin", "en", "Wahiduddin Khan", "https://en.wikipedia.org/wiki/Wahiduddin_Khan")
 	insert_quran_translation(verses, get_path("tanzil_net/translations/en.yusufali.txt"), "yusufali", "en", "Abdullah Yusuf Ali", "https://en.wikipedia.org/wiki/Abdullah_Yusuf_Ali")
 
-	chapters = build_chapters(get_path("tanzil_net/quran-data.xml"), verses)
+	return build_chapters(get_path("tanzil_net/quran-data.xml"), verses)
+
+def build_quran() -> Chapter:
+	version = code_version(__file__, *MODEL_FILES)
+	sources = quran_sources()
+	chapters = load_cached(BOOK_INDEX, sources, version)
+	if chapters is None:
+		chapters = build_quran_chapters()
+		store_cached(BOOK_INDEX, sources, version, chapters)
 
 	q = Chapter()
 	q.index = BOOK_INDEX
@@ -201,16 +216,21 @@ def build_quran() -> Chapter:
 	return q
 
 def insert_verse_content(db: Session, quran: Quran):
+	load_book_parts(db, verse_content_parts(quran))
+
+def verse_content_parts(quran: Quran) -> Iterator[BookPartCreate]:
 	for chapter in quran.chapters:
 		for verse in chapter.verses:
-			obj_in = BookPartCreate (
+			yield BookPartCreate (
 				index = index_from_path(chapter.path) + ":" + str(verse.local_index),
 				kind = "verse_content",
 				data = verse,
 				last_updated_id = 1
 			)
-			book = crud.book_part.upsert(db, obj_in=obj_in)
-			logger.info("Inserted Quran verse content into book_part ID %i with index %s", book.id, book.index)
+
+def quran_parts(quran: Chapter) -> Iterator[BookPartCreate]:
+	yield from chapter_parts(quran)
+	yield from verse_content_parts(quran)
 
 def init_quran(db_session: Session):
 	quran = build_quran()
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# the parsers import app.db.session, which needs a database on import
+os.environ.setdefault(
+	"DATABASE_URL",
+	"sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db") + "?check_same_thread=False",
+)
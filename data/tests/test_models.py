@@ -0,0 +1,77 @@
+"""
+Memory use of the ingestion tree, built the way `build_quran` builds it: from
+the raw Tanzil files when they are there, else from the synthetic tree of
+`data.bench_encoder`.
+
+	python -m pytest data/tests
+"""
+import os
+import pickle
+import tracemalloc
+
+import pytest
+
+from data import bench_encoder, quran
+from data.models import Chapter, Translation, Verse
+
+# the small synthetic tree still has every translation of each verse
+SYNTHETIC_VERSES = 1140
+
+
+class PlainModel():
+	"""
+	The models as they were before __slots__ and interning.
+	"""
+
+class PlainVerse(PlainModel):
+	pass
+
+class PlainChapter(PlainModel):
+	pass
+
+class PlainTranslation(PlainModel):
+	pass
+
+
+@pytest.fixture
+def build_chapters(monkeypatch):
+	monkeypatch.setattr(bench_encoder, "VERSES", SYNTHETIC_VERSES)
+
+	def build(chapter=Chapter, verse=Verse, translation=Translation):
+		for module in (quran, bench_encoder):
+			monkeypatch.setattr(module, "Chapter", chapter)
+			monkeypatch.setattr(module, "Verse", verse)
+			monkeypatch.setattr(module, "Translation", translation)
+		if os.path.exists(quran.get_path("tanzil_net/quran_simple.txt")):
+			return quran.build_quran_chapters()
+		return bench_encoder.build_book().chapters
+
+	return build
+
+
+def peak_memory(build) -> int:
+	tracemalloc.start()
+	try:
+		build()
+		return tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+
+def translations(chapters):
+	return [translation for chapter in chapters for verse in chapter.verses for translation in verse.translations]
+
+
+def test_slots_lower_peak_memory(build_chapters):
+	before = peak_memory(lambda: build_chapters(PlainChapter, PlainVerse, PlainTranslation))
+	after = peak_memory(build_chapters)
+	assert after < before * 0.9, (before, after)
+
+
+def test_translation_strings_are_shared(build_chapters):
+	chapters = build_chapters()
+	# also once unpickled from the parse cache
+	for built in (chapters, pickle.loads(pickle.dumps(chapters))):
+		for field in Translation.INTERNED:
+			values = [getattr(translation, field) for translation in translations(built)]
+			assert len({id(value) for value in values}) == len(set(values)), field